@@ -1,12 +1,19 @@
+import asyncio
+import dataclasses
 import enum
+import json
+import ssl
 from pathlib import Path
-from typing import Iterator
+from typing import Awaitable, Callable, Dict, Iterator, Optional
 
+import aiohttp
 from chia.rpc.full_node_rpc_client import FullNodeRpcClient
 from chia.rpc.rpc_client import RpcClient
 from chia.rpc.wallet_rpc_client import WalletRpcClient
+from chia.server.server import ssl_context_for_client
 from chia.util.config import load_config
 from chia.util.default_root import DEFAULT_ROOT_PATH
+from chia.util.ws_message import create_payload_dict
 from sqlalchemy.orm import Session
 
 from app.config import settings
@@ -32,53 +39,249 @@ class NodeType(str, enum.Enum):
     WALLET = "WALLET"
 
 
-async def _get_rpc_client(
-    node_type: NodeType,
-    self_hostname: str,
-    rpc_port: int,
-    root_path: Path = DEFAULT_ROOT_PATH,
-) -> Iterator[RpcClient]:
+@dataclasses.dataclass
+class RpcClientManager(object):
+    """Owns one long-lived RPC client for a node type.
 
-    rpc_client_cls = {
-        NodeType.FULL_NODE: FullNodeRpcClient,
-        NodeType.WALLET: WalletRpcClient,
-    }.get(node_type)
+    The client (and its TLS/aiohttp session) is created lazily on first use and
+    then shared by every request and cron task. A failed health probe or a
+    connection error drops the client so that the next caller reconnects.
+    """
 
-    config = load_config(root_path, "config.yaml")
+    node_type: NodeType
+    self_hostname: str
+    rpc_port: int
+    root_path: Path = DEFAULT_ROOT_PATH
 
-    client = await rpc_client_cls.create(
-        self_hostname=self_hostname,
-        port=rpc_port,
-        root_path=root_path,
-        net_config=config,
+    _client: Optional[RpcClient] = dataclasses.field(default=None, init=False)
+    _lock: asyncio.Lock = dataclasses.field(default_factory=asyncio.Lock, init=False)
+    _net_config: Optional[Dict] = dataclasses.field(default=None, init=False)
+
+    @property
+    def rpc_client_cls(self):
+        return {
+            NodeType.FULL_NODE: FullNodeRpcClient,
+            NodeType.WALLET: WalletRpcClient,
+        }.get(self.node_type)
+
+    @property
+    def net_config(self) -> Dict:
+        if self._net_config is None:
+            self._net_config = load_config(self.root_path, "config.yaml")
+
+        return self._net_config
+
+    async def _connect(self) -> RpcClient:
+        backoff: float = settings.RPC_RECONNECT_BACKOFF
+
+        for attempt in range(1, settings.RPC_RECONNECT_ATTEMPTS + 1):
+            try:
+                return await self.rpc_client_cls.create(
+                    self_hostname=self.self_hostname,
+                    port=self.rpc_port,
+                    root_path=self.root_path,
+                    net_config=self.net_config,
+                )
+
+            except Exception as e:
+                if attempt == settings.RPC_RECONNECT_ATTEMPTS:
+                    raise
+
+                logger.warning(
+                    f"Connect {self.node_type.name} rpc failure, retrying in {backoff}s. "
+                    f"attempt:{attempt} error:{e}"
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, settings.RPC_RECONNECT_BACKOFF_MAX)
+
+    async def get_client(self) -> RpcClient:
+        if self._client is not None:
+            return self._client
+
+        async with self._lock:
+            if self._client is None:
+                self._client = await self._connect()
+                logger.info(
+                    f"Connected {self.node_type.name} rpc at "
+                    f"{self.self_hostname}:{self.rpc_port}"
+                )
+
+        return self._client
+
+    async def reset(self) -> None:
+        async with self._lock:
+            client: Optional[RpcClient] = self._client
+            self._client = None
+
+        if client is not None:
+            client.close()
+            await client.await_closed()
+
+    async def check_health(self) -> bool:
+        if self._client is None:
+            return True
+
+        try:
+            await self._client.fetch("healthz", {})
+            return True
+
+        except Exception as e:
+            logger.warning(f"Health check of {self.node_type.name} rpc failed: {e}")
+            await self.reset()
+            return False
+
+
+rpc_client_managers: Dict[NodeType, RpcClientManager] = {
+    NodeType.FULL_NODE: RpcClientManager(
+        node_type=NodeType.FULL_NODE,
+        self_hostname=settings.CHIA_HOSTNAME,
+        rpc_port=settings.CHIA_FULL_NODE_RPC_PORT,
+        root_path=settings.CHIA_ROOT,
+    ),
+    NodeType.WALLET: RpcClientManager(
+        node_type=NodeType.WALLET,
+        self_hostname=settings.CHIA_HOSTNAME,
+        rpc_port=settings.CHIA_WALLET_RPC_PORT,
+        root_path=settings.CHIA_ROOT,
+    ),
+}
+
+
+async def check_rpc_clients_health() -> None:
+    for manager in rpc_client_managers.values():
+        await manager.check_health()
+
+
+async def close_rpc_clients() -> None:
+    for manager in rpc_client_managers.values():
+        await manager.reset()
+
+
+@dataclasses.dataclass
+class PeakWatcher(object):
+    """Follows the peak of the full node through the daemon websocket.
+
+    The watcher registers with the daemon as `service_name` to receive the
+    `get_blockchain_state` messages that the full node sends on every new peak, and
+    calls `on_peak` with the peak height. A dropped connection is retried with
+    exponential backoff for as long as the watcher runs.
+    """
+
+    uri: str
+    on_peak: Callable[[int], Awaitable[None]]
+    ssl_context: Optional[ssl.SSLContext] = None
+    service_name: str = "wallet_ui"
+
+    _task: Optional[asyncio.Task] = dataclasses.field(default=None, init=False)
+    _backoff: float = dataclasses.field(
+        default=settings.RPC_RECONNECT_BACKOFF, init=False
     )
 
+    @staticmethod
+    def parse_peak_height(message: Dict) -> Optional[int]:
+        if message.get("command") != "get_blockchain_state":
+            return None
+
+        state: Dict = message.get("data", {}).get("blockchain_state") or {}
+        peak: Optional[Dict] = state.get("peak")
+        if peak is None:
+            return None
+
+        return peak["height"]
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._watch()
+                logger.warning(f"Watch peaks connection closed at {self.uri}")
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception as e:
+                logger.warning(f"Watch peaks failure at {self.uri}: {e}")
+
+            logger.info(f"Reconnecting peak watcher in {self._backoff}s")
+            await asyncio.sleep(self._backoff)
+            self._backoff = min(self._backoff * 2, settings.RPC_RECONNECT_BACKOFF_MAX)
+
+    async def _watch(self) -> None:
+        async with (
+            aiohttp.ClientSession() as session,
+            session.ws_connect(
+                self.uri,
+                ssl=self.ssl_context,
+                heartbeat=30,
+                max_msg_size=50 * 1000 * 1000,
+            ) as websocket,
+        ):
+            await websocket.send_json(
+                create_payload_dict(
+                    "register_service",
+                    {"service": self.service_name},
+                    "client",
+                    "daemon",
+                )
+            )
+            logger.info(f"Watching peaks at {self.uri}")
+            self._backoff = settings.RPC_RECONNECT_BACKOFF
+
+            async for message in websocket:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    break
+
+                height: Optional[int] = self.parse_peak_height(json.loads(message.data))
+                if height is not None:
+                    await self.on_peak(height)
+
+
+def create_peak_watcher(on_peak: Callable[[int], Awaitable[None]]) -> PeakWatcher:
+    manager: RpcClientManager = rpc_client_managers[NodeType.FULL_NODE]
+    net_config: Dict = manager.net_config
+
+    ssl_context: ssl.SSLContext = ssl_context_for_client(
+        manager.root_path / net_config["private_ssl_ca"]["crt"],
+        manager.root_path / net_config["private_ssl_ca"]["key"],
+        manager.root_path / net_config["daemon_ssl"]["private_crt"],
+        manager.root_path / net_config["daemon_ssl"]["private_key"],
+    )
+
+    return PeakWatcher(
+        uri=f"wss://{settings.CHIA_HOSTNAME}:{settings.CHIA_DAEMON_PORT}",
+        on_peak=on_peak,
+        ssl_context=ssl_context,
+    )
+
+
+async def _get_rpc_client(node_type: NodeType) -> Iterator[RpcClient]:
+    manager: RpcClientManager = rpc_client_managers[node_type]
+    client: RpcClient = await manager.get_client()
+
     try:
         yield client
+    except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+        logger.warning(f"Error in {node_type.name.lower()} rpc: {e}")
+        await manager.reset()
     except Exception as e:
         logger.warning(f"Error in wallet: {e}")
-    finally:
-        client.close()
-        await client.await_closed()
 
 
 async def get_wallet_rpc_client() -> Iterator[WalletRpcClient]:
 
-    async for _ in _get_rpc_client(
-        node_type=NodeType.WALLET,
-        self_hostname=settings.CHIA_HOSTNAME,
-        rpc_port=settings.CHIA_WALLET_RPC_PORT,
-        root_path=settings.CHIA_ROOT,
-    ):
+    async for _ in _get_rpc_client(node_type=NodeType.WALLET):
         yield _
 
 
 async def get_full_node_rpc_client() -> Iterator[FullNodeRpcClient]:
 
-    async for _ in _get_rpc_client(
-        node_type=NodeType.FULL_NODE,
-        self_hostname=settings.CHIA_HOSTNAME,
-        rpc_port=settings.CHIA_FULL_NODE_RPC_PORT,
-        root_path=settings.CHIA_ROOT,
-    ):
+    async for _ in _get_rpc_client(node_type=NodeType.FULL_NODE):
         yield _
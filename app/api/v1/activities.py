@@ -1,7 +1,8 @@
-from typing import Dict, List, Optional
+from typing import List, Optional, Tuple
 
 from fastapi import APIRouter, Depends
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, func, select
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
@@ -10,11 +11,45 @@ from app.config import ExecutionMode, settings
 from app.core.types import GatewayMode
 from app.errors import ErrorCode
 from app.logger import logger
-from app.utils import disallow
+from app.utils import decode_cursor, disallow, encode_cursor
 
 router = APIRouter()
 
 
+# activities are joined with the climate warehouse mirror, which only holds
+# tokenized units; units split from one another share the asset id of their
+# token, so each activity is joined with one unit per asset id
+ACTIVITY_WITH_CW_MODEL: Tuple = (
+    models.Activity,
+    models.ClimateWareHouseUnit,
+    models.ClimateWareHouseOrganization,
+    models.ClimateWareHouseProject,
+)
+ACTIVITY_WITH_CW_JOINS: List[Tuple] = [
+    (
+        models.ClimateWareHouseUnit,
+        and_(
+            models.ClimateWareHouseUnit.asset_id == models.Activity.asset_id,
+            models.ClimateWareHouseUnit.warehouse_unit_id.in_(
+                select(
+                    func.min(models.ClimateWareHouseUnit.warehouse_unit_id)
+                ).group_by(models.ClimateWareHouseUnit.asset_id)
+            ),
+        ),
+    ),
+    (
+        models.ClimateWareHouseOrganization,
+        models.ClimateWareHouseOrganization.org_uid
+        == models.ClimateWareHouseUnit.org_uid,
+    ),
+    (
+        models.ClimateWareHouseProject,
+        models.ClimateWareHouseProject.warehouse_project_id
+        == models.ClimateWareHouseUnit.warehouse_project_id,
+    ),
+]
+
+
 @router.get("/", response_model=schemas.ActivitiesResponse)
 @disallow([ExecutionMode.CLIENT])
 async def get_activity(
@@ -23,87 +58,118 @@ async def get_activity(
     mode: Optional[GatewayMode] = None,
     page: int = 1,
     limit: int = 10,
+    cursor: Optional[str] = None,
+    with_total: Optional[bool] = None,
     db: Session = Depends(deps.get_db_session),
 ):
     """Get activity.
 
     This endpoint is to be called by the explorer.
+
+    Passing the `next_cursor` of a previous response as `cursor` switches to keyset
+    pagination, in which case `page` is ignored and `total` is only counted when
+    `with_total` is set.
     """
-    logger.info(f"Get activity. search:{search} search_by:{search_by} mode:{mode} page:{page} limit:{limit}")
+    logger.info(
+        f"Get activity. search:{search} search_by:{search_by} mode:{mode} page:{page} limit:{limit} cursor:{cursor}"
+    )
+
+    cursor_values: Optional[Tuple[int, ...]] = None
+    if cursor is not None:
+        try:
+            cursor_values = decode_cursor(cursor)
+        except ValueError:
+            raise ErrorCode().bad_request_error(message="cursor is invalid")
+
+        if len(cursor_values) != 2:
+            raise ErrorCode().bad_request_error(message="cursor is invalid")
+
+    if with_total is None:
+        with_total = cursor is None
 
-    db_crud = crud.DBCrud(db=db)
+    db_crud = crud.AsyncDBCrud(db=db)
 
     activity_filters = {"or": [], "and": []}
-    cw_filters = {}
     match search_by:
         case schemas.ActivitySearchBy.ONCHAIN_METADATA:
             if search is not None:
-                activity_filters["or"].extend(
-                    [
-                        models.Activity.beneficiary_name.like(f"%{search}%"),
-                        models.Activity.beneficiary_address.like(f"%{search}%"),
-                        models.Activity.beneficiary_puzzle_hash.like(f"%{search}%"),
-                    ]
+                activity_filters["and"].append(
+                    await db_crud.activity_search_filter(search)
                 )
         case schemas.ActivitySearchBy.CLIMATE_WAREHOUSE:
             if search is not None:
-                cw_filters["search"] = search
+                activity_filters["and"].append(
+                    await db_crud.climate_warehouse_search_filter(search)
+                )
         case None:
             pass
         case _:
             raise ErrorCode().bad_request_error(message="search_by is invalid")
 
-    climate_data = crud.ClimateWareHouseCrud(
-        url=settings.CADT_API_SERVER_HOST,
-        api_key=settings.CADT_API_KEY,
-    ).combine_climate_units_and_metadata(search=cw_filters)
-
-
-    if len(climate_data) == 0:
-        logger.warning(f"No data to get from climate warehouse. search:{cw_filters}")
-        return schemas.ActivitiesResponse()
-
-    units = {f"0x{unit['marketplaceIdentifier']}": unit for unit in climate_data}
-
-    logger.info(f"units:{units}")
-
-    if len(units) != 0:
-        activity_filters["and"].append(models.Activity.asset_id.in_(units.keys()))
-
     if mode is not None:
-        activity_filters["and"].append(models.Activity.mode.ilike(mode.name))
+        activity_filters["and"].append(models.Activity.mode == mode.name)
 
-    activities: List[models.Activity]
-    total: int
+    # activities are scanned up to the peak, but only shown once `MIN_DEPTH` deep
+    state: Optional[models.State] = await db_crud.select_block_state_first()
+    if (state is not None) and (state.peak_height is not None):
+        activity_filters["and"].append(
+            models.Activity.height <= state.peak_height - settings.MIN_DEPTH + 1
+        )
 
-    (activities, total) = db_crud.select_activity_with_pagination(
-        model=models.Activity,
-        filters=activity_filters,
-        order_by=models.Activity.height,
-        page=page, 
-        limit=limit,
-    )
-    if len(activities) == 0:
+    rows: List[Tuple]
+    total: Optional[int]
+
+    if cursor_values is None:
+        (rows, total) = await db_crud.select_activity_with_pagination(
+            model=ACTIVITY_WITH_CW_MODEL,
+            filters=activity_filters,
+            order_by=[models.Activity.height, models.Activity.id],
+            page=page,
+            limit=limit,
+            with_total=with_total,
+            joins=ACTIVITY_WITH_CW_JOINS,
+        )
+    else:
+        (rows, total) = await db_crud.select_activity_with_cursor(
+            model=ACTIVITY_WITH_CW_MODEL,
+            filters=activity_filters,
+            order_by=[models.Activity.height, models.Activity.id],
+            limit=limit,
+            cursor=cursor_values,
+            with_total=with_total,
+            joins=ACTIVITY_WITH_CW_JOINS,
+        )
+    if len(rows) == 0:
         logger.warning(
             f"No data to get from activities. filters:{activity_filters} page:{page} limit:{limit}"
         )
         return schemas.ActivitiesResponse()
 
     activities_with_cw: List[schemas.ActivityWithCW] = []
-    for activity in activities:
-        unit: Dict = units.get(activity.asset_id).copy()
-        token = unit.pop("token", None)
-        org = unit.pop("organization", None)
-        project = unit.pop("project", None)
-
+    for (activity, unit, org, project) in rows:
         activity_with_cw = schemas.ActivityWithCW(
-            token=token,
-            cw_unit=unit,
-            cw_org=org,
-            cw_project=project,
+            token=unit.token,
+            cw_unit=unit.data,
+            cw_org=org.data,
+            cw_project=project.data,
             metadata=activity.metadata_,
             **jsonable_encoder(activity),
         )
         activities_with_cw.append(activity_with_cw)
 
-    return schemas.ActivitiesResponse(activities=activities_with_cw, total=total)
+    next_cursor: Optional[str] = None
+    if len(rows) == limit:
+        last_activity: models.Activity = rows[-1][0]
+        next_cursor = encode_cursor((last_activity.height, last_activity.id))
+
+    return schemas.ActivitiesResponse(
+        activities=activities_with_cw, total=total, next_cursor=next_cursor
+    )
+
+
+@router.get("/cache", response_model=schemas.ClimateWareHouseCacheState)
+@disallow([ExecutionMode.CLIENT])
+async def get_climate_warehouse_cache_state():
+    """Get the hit and miss counters of the climate warehouse cache."""
+
+    return crud.climate_warehouse_cache.to_schema()
@@ -1,5 +1,9 @@
 import asyncio
-from typing import Any, Dict, List, Optional
+import dataclasses
+import os
+import socket
+import time
+from typing import Dict, List, Optional, Set, Tuple
 
 from blspy import G1Element
 from chia.consensus.block_record import BlockRecord
@@ -10,20 +14,91 @@ from fastapi.encoders import jsonable_encoder
 from fastapi_utils.tasks import repeat_every
 from sqlalchemy_utils import create_database, database_exists
 
-from app import crud, schemas
+from app import crud, models, schemas
 from app.api import dependencies as deps
 from app.config import ExecutionMode, settings
+from app.core.climate_wallet.wallet import ClimateObserverWallet
+from app.core.types import ClimateToken, ClimateTokenIndex
 from app.core.utils import add_0x_prefix
 from app.db.base import Base
+from app.db.executor import run_in_db_executor
+from app.db.migrations import run_migrations
 from app.db.session import get_engine_cls
+from app.db.writer import db_writer
 from app.errors import ErrorCode
 from app.logger import logger
 from app.models import State
 from app.utils import as_async_contextmanager, disallow
 
+
+@dataclasses.dataclass
+class ScanWindow(object):
+    """Sizes block windows so that each takes about `target_seconds` to scan.
+
+    The seconds per block of previous windows, which grow with both the RPC
+    latency and the number of coin records to fetch spends for, are averaged to
+    size the next window. The size at most doubles or halves at a time.
+    """
+
+    size: int = settings.BLOCK_RANGE
+    min_size: int = settings.BLOCK_RANGE_MIN
+    max_size: int = settings.BLOCK_RANGE_MAX
+    target_seconds: float = settings.BLOCK_RANGE_TARGET_SECONDS
+    smoothing: float = 0.5
+
+    seconds_per_block: Optional[float] = None
+    blocks_per_second: Optional[float] = None
+    coin_records_per_second: Optional[float] = None
+    last_window_seconds: Optional[float] = None
+
+    def update(self, blocks: int, coin_records: int, seconds: float) -> None:
+        if blocks <= 0:
+            return
+
+        seconds = max(seconds, 1e-3)
+        self.blocks_per_second = blocks / seconds
+        self.coin_records_per_second = coin_records / seconds
+        self.last_window_seconds = seconds
+
+        # a window cut short, e.g. at the peak, is dominated by the RPC latency and
+        # only says something about larger windows if it was already too slow
+        if blocks < self.size and seconds <= self.target_seconds:
+            return
+
+        if self.seconds_per_block is None:
+            self.seconds_per_block = seconds / blocks
+        else:
+            self.seconds_per_block = (
+                self.smoothing * (seconds / blocks)
+                + (1 - self.smoothing) * self.seconds_per_block
+            )
+
+        size: int = int(self.target_seconds / self.seconds_per_block)
+        size = min(max(size, self.size // 2), self.size * 2)
+        self.size = min(max(size, self.min_size), self.max_size)
+
+    def to_schema(self) -> schemas.ScannerState:
+        return schemas.ScannerState(
+            block_range=self.size,
+            blocks_per_second=self.blocks_per_second,
+            coin_records_per_second=self.coin_records_per_second,
+            last_window_seconds=self.last_window_seconds,
+        )
+
+
 router = APIRouter()
 errorcode = ErrorCode()
 lock = asyncio.Lock()
+scan_window = ScanWindow()
+# set on every new peak reported by `peak_watcher`
+scan_event = asyncio.Event()
+peak_watcher: Optional[deps.PeakWatcher] = None
+scan_on_new_peak_task: Optional[asyncio.Task] = None
+# only the process holding the scanner lease scans, see `renew_scanner_lease`
+scanner_id = f"{socket.gethostname()}:{os.getpid()}"
+is_scanner_leader = False
+# the token registry, loaded from the database on the first scan
+_token_by_asset_id: Dict[str, ClimateToken] = {}
 
 
 @router.on_event("startup")
@@ -37,84 +112,376 @@ async def init_db():
 
     logger.info(f"Database {Engine.url} exists: " f"{database_exists(Engine.url)}")
 
-    Base.metadata.create_all(Engine)
+    await run_in_db_executor(Base.metadata.create_all, Engine)
+    await run_in_db_executor(run_migrations, Engine)
 
     async with as_async_contextmanager(deps.get_db_session) as db:
         state = State(id=1, current_height=settings.BLOCK_START, peak_height=None)
         db_state = [jsonable_encoder(state)]
 
-        db_crud = crud.DBCrud(db=db)
-        db_crud.batch_insert_ignore_db(table=State.__tablename__, models=db_state)
+        db_crud = crud.AsyncDBCrud(db=db)
+        await db_crud.batch_insert_ignore_db(table=State.__tablename__, models=db_state)
+
+
+@router.on_event("shutdown")
+async def close_db_writer():
+    await db_writer.close()
+
+
+async def acquire_scanner_lease() -> bool:
+    """Take or renew the scanner lease for `scanner_id`.
+
+    The lease is written on a session of its own rather than through `db_writer`,
+    so that a renewal never waits behind large ingest batches.
+    """
+
+    async with as_async_contextmanager(deps.get_db_session) as db:
+        return await crud.AsyncDBCrud(db=db).acquire_lease(
+            name="scanner",
+            holder=scanner_id,
+            seconds=settings.SCANNER_LEASE_SECONDS,
+        )
+
+
+async def release_scanner_lease() -> bool:
+    async with as_async_contextmanager(deps.get_db_session) as db:
+        return await crud.AsyncDBCrud(db=db).release_lease(
+            name="scanner", holder=scanner_id
+        )
+
+
+@router.on_event("startup")
+@repeat_every(seconds=max(settings.SCANNER_LEASE_SECONDS // 3, 1), logger=logger)
+@disallow([ExecutionMode.REGISTRY, ExecutionMode.CLIENT])
+async def renew_scanner_lease() -> None:
+    global is_scanner_leader
+
+    if not settings.SCANNER_ENABLED:
+        return
+
+    try:
+        is_leader: bool = await acquire_scanner_lease()
+    except Exception as e:
+        logger.error(f"Renew scanner lease failure, ErrorMessage: {e}")
+        is_leader = False
+
+    if is_leader != is_scanner_leader:
+        logger.info(
+            f"Scanner {scanner_id} {'acquired' if is_leader else 'lost'} the scanner lease"
+        )
+    is_scanner_leader = is_leader
+
+
+@router.on_event("shutdown")
+async def close_scanner_lease() -> None:
+    global is_scanner_leader
+
+    if not is_scanner_leader:
+        return
+
+    # another process takes over without waiting for the lease to expire
+    is_scanner_leader = False
+    try:
+        await release_scanner_lease()
+    except Exception as e:
+        logger.error(f"Release scanner lease failure, ErrorMessage: {e}")
+
+
+async def get_tokens(
+    db_crud: crud.AsyncDBCrud,
+    climate_units: List[Dict],
+) -> List[ClimateToken]:
+    """Look up the tokens of `climate_units` in the token registry, once per asset
+    id since units split from one another share their token.
+
+    Tokens seen for the first time have their puzzle hashes computed once and are
+    registered, so that later scans never curry the tail and gateway puzzles again.
+    """
+
+    if len(_token_by_asset_id) == 0:
+        for token in await db_crud.select_tokens():
+            _token_by_asset_id[f"0x{token.tail_program_hash.hex()}"] = token
+
+    tokens: List[ClimateToken] = []
+    seen_asset_ids: Set[str] = set()
+    new_token_by_asset_id: Dict[str, ClimateToken] = {}
+    for unit in climate_units:
+        asset_id: str = add_0x_prefix(unit.get("marketplaceIdentifier"))
+        if asset_id in seen_asset_ids:
+            continue
+
+        token: Optional[ClimateToken] = _token_by_asset_id.get(
+            asset_id
+        ) or new_token_by_asset_id.get(asset_id)
+        if token is None:
+            metadata: Optional[Dict] = unit.get("token")
+
+            # is None or empty
+            if not metadata:
+                logger.warning(
+                    f"Can not get token metadata in climate warehouse. asset_id:{asset_id}"
+                )
+                continue
+
+            token_index = ClimateTokenIndex(
+                org_uid=metadata["org_uid"],
+                warehouse_project_id=metadata["warehouse_project_id"],
+                vintage_year=metadata["vintage_year"],
+                sequence_num=metadata["sequence_num"],
+            )
+            public_key = G1Element.from_bytes(hexstr_to_bytes(metadata["public_key"]))
+            token = ClimateObserverWallet(
+                token_index=token_index,
+                root_public_key=public_key,
+                full_node_client=None,
+            ).token
+
+            new_token_by_asset_id[asset_id] = token
+
+        seen_asset_ids.add(asset_id)
+        tokens.append(token)
+
+    if len(new_token_by_asset_id) > 0:
+        logger.info(f"Registering {len(new_token_by_asset_id)} new tokens")
+        await db_writer.submit(
+            crud.DBCrud.batch_insert_ignore_token,
+            tokens=list(new_token_by_asset_id.values()),
+        )
+        # only registered tokens are cached, so failed ones are retried next scan
+        _token_by_asset_id.update(new_token_by_asset_id)
+
+    return tokens
+
+
+async def _rollback_reorg(
+    db_crud: crud.AsyncDBCrud,
+    blockchain: crud.BlockChainCrud,
+) -> bool:
+    """Compare the recorded header hashes against the full node, and roll back to
+    the fork point if they diverged.
+
+    Returns whether a rollback happened.
+    """
+
+    blocks: List[models.Block] = await db_crud.select_blocks()
+    if len(blocks) == 0:
+        return False
+
+    header_hashes: Dict[int, str] = await blockchain.get_header_hashes(
+        start_height=blocks[0].height,
+        end_height=blocks[-1].height + 1,
+    )
+
+    # heights above the peak of the full node can not be checked yet
+    fork_height: Optional[int] = None
+    for block in blocks:
+        if block.height not in header_hashes:
+            break
+
+        if header_hashes[block.height] != block.header_hash:
+            fork_height = block.height
+            break
+
+    if fork_height is None:
+        return False
+
+    if fork_height == blocks[0].height:
+        logger.warning(
+            f"Reorg deeper than the {len(blocks)} recorded blocks, rolling back to {fork_height}"
+        )
+    else:
+        logger.warning(f"Reorg detected, rolling back to {fork_height}")
+
+    await db_writer.submit(crud.DBCrud.rollback_to_height, height=fork_height)
+    return True
+
+
+async def scan_tokens(
+    blockchain: crud.BlockChainCrud,
+    tokens: List[ClimateToken],
+    start_height: int,
+    end_height: int,
+) -> List[schemas.Activity]:
+    """Scan the blocks in `[start_height, end_height)` for activities of `tokens`,
+    in token order."""
+
+    semaphore = asyncio.Semaphore(settings.SCAN_CONCURRENCY)
+
+    async def _scan_token(token: ClimateToken) -> List[schemas.Activity]:
+        async with semaphore:
+            return await blockchain.get_activities_by_token(
+                token=token,
+                start_height=start_height,
+                end_height=end_height,
+            )
+
+    async def _scan_tokens(batch: List[ClimateToken]) -> List[List[schemas.Activity]]:
+        async with semaphore:
+            return await blockchain.get_activities_by_tokens(
+                tokens=batch,
+                start_height=start_height,
+                end_height=end_height,
+            )
+
+    # tokens are scanned concurrently, but `gather` keeps the results in token order
+    activities_by_token: List[List[schemas.Activity]]
+    if settings.SCAN_BY_PUZZLE_HASHES:
+        batch_size: int = settings.SCAN_PUZZLE_HASH_BATCH_SIZE
+        activities_by_batch: List[List[List[schemas.Activity]]] = await asyncio.gather(
+            *[
+                _scan_tokens(tokens[index : index + batch_size])
+                for index in range(0, len(tokens), batch_size)
+            ]
+        )
+        activities_by_token = [
+            activities for batch in activities_by_batch for activities in batch
+        ]
+
+    else:
+        activities_by_token = await asyncio.gather(
+            *[_scan_token(token) for token in tokens]
+        )
+
+    return [activity for activities in activities_by_token for activity in activities]
 
 
 async def _scan_token_activity(
-    db_crud: crud.DBCrud,
+    db_crud: crud.AsyncDBCrud,
     climate_warehouse: crud.ClimateWareHouseCrud,
     blockchain: crud.BlockChainCrud,
 ) -> bool:
 
-    state = db_crud.select_block_state_first()
+    state = await db_crud.select_block_state_first()
     if state.peak_height is None:
         logger.warning("Full node state has not been retrieved.")
         return False
 
-    start_height = state.current_height
-    end_height = min(start_height + settings.BLOCK_RANGE, state.peak_height + 1)
+    if await _rollback_reorg(db_crud=db_crud, blockchain=blockchain):
+        return True
 
-    # make sure
-    # - shallow records (<`MIN_DEPTH`) are revisited
-    # - lookback 36 hours to compensate for CW metadata delay
-    target_start_height = end_height - settings.MIN_DEPTH - settings.LOOKBACK_DEPTH
+    # reorgs are rolled back, so blocks are scanned up to the peak
+    synced_height: int = state.peak_height + 1
 
-    if state.current_height == target_start_height:
+    # tokens are discovered from the mirror kept by `sync_climate_warehouse`, and
+    # from the climate warehouse itself until the first sync
+    climate_units: List[Dict] = await db_crud.select_climate_warehouse_units()
+    if len(climate_units) == 0:
+        climate_units = await climate_warehouse.combine_climate_units_and_metadata(
+            search={}
+        )
+
+    all_tokens: List[ClimateToken] = await get_tokens(
+        db_crud=db_crud, climate_units=climate_units
+    )
+    scanned_height_by_asset_id: Dict[
+        str, Optional[int]
+    ] = await db_crud.select_token_scanned_heights()
+
+    # tokens are scanned from their own scanned height, where new tokens start at
+    # `BLOCK_START`, and tokens at the same height share windows
+    tokens_by_height: Dict[int, List[ClimateToken]] = {}
+    for token in all_tokens:
+        scanned_height: Optional[int] = scanned_height_by_asset_id.get(
+            f"0x{token.tail_program_hash.hex()}"
+        )
+        if scanned_height is None:
+            scanned_height = settings.BLOCK_START
+
+        tokens_by_height.setdefault(scanned_height, []).append(token)
+
+    heights: List[int] = [
+        height for height in sorted(tokens_by_height.keys()) if height < synced_height
+    ]
+    if len(heights) == 0:
         logger.info("Activity synced.")
         return False
 
-    logger.info(f"Scanning blocks {start_height} - {end_height} for activity")
+    # tokens at the tip advance every scan, while lower tokens catch up alongside
+    # them until they reach the next height and scan together from then on
+    windows: List[Tuple[int, int, List[ClimateToken]]] = []
+    for (index, start_height) in enumerate(heights):
+        end_height: int = min(start_height + scan_window.size, synced_height)
+        if index + 1 < len(heights):
+            end_height = min(end_height, heights[index + 1])
 
-    climate_units: Dict[
-        str, Any
-    ] = climate_warehouse.combine_climate_units_and_metadata(search={})
+        windows.append((start_height, end_height, tokens_by_height[start_height]))
 
+    tip_height: int = max(tokens_by_height.keys())
+    window_start_time: float = time.monotonic()
+    num_coin_records: int = blockchain.num_coin_records
 
-    for unit in climate_units:
-        token: Optional[Dict] = unit.get("token")
+    await asyncio.gather(
+        *[
+            _scan_window(
+                blockchain=blockchain,
+                tokens=tokens,
+                start_height=start_height,
+                end_height=end_height,
+                synced_height=synced_height,
+                # only the tip moves the state of the scanner
+                is_tip=(start_height == tip_height),
+            )
+            for (start_height, end_height, tokens) in windows
+        ]
+    )
 
-        # is None or empty
-        if not token:
-            asset_id =  add_0x_prefix(unit.get("marketplaceIdentifier"))
-            logger.warning(f"Can not get token metadata in climate warehouse. asset_id:0x{asset_id}")
-            continue
+    scan_window.update(
+        blocks=max(
+            end_height - start_height for (start_height, end_height, _) in windows
+        ),
+        coin_records=blockchain.num_coin_records - num_coin_records,
+        seconds=time.monotonic() - window_start_time,
+    )
+    return True
 
-        public_key = G1Element.from_bytes(hexstr_to_bytes(token["public_key"]))
 
-        activities: List[schemas.Activity] = await blockchain.get_activities(
-            org_uid=token["org_uid"],
-            warehouse_project_id=token["warehouse_project_id"],
-            vintage_year=token["vintage_year"],
-            sequence_num=token["sequence_num"],
-            public_key=public_key,
-            start_height=start_height,
+async def _scan_window(
+    blockchain: crud.BlockChainCrud,
+    tokens: List[ClimateToken],
+    start_height: int,
+    end_height: int,
+    synced_height: int,
+    is_tip: bool,
+) -> None:
+    logger.info(
+        f"Scanning blocks {start_height} - {end_height} of {len(tokens)} tokens for activity"
+    )
+
+    # header hashes are fetched before coin records, so that a reorg in between
+    # shows up as a mismatch on the next scan; only the latest `REORG_DEPTH`
+    # heights are tracked, so deeper windows skip them
+    header_hashes: Optional[Dict[int, str]] = None
+    tracked_height: int = max(start_height, synced_height - settings.REORG_DEPTH)
+    if tracked_height < end_height:
+        header_hashes = await blockchain.get_header_hashes(
+            start_height=tracked_height,
             end_height=end_height,
-            peak_height=state.peak_height,
         )
 
-        if len(activities) == 0:
-            continue
-
-        db_crud.batch_insert_ignore_activity(activities)
+    window_activities: List[schemas.Activity] = await scan_tokens(
+        blockchain=blockchain,
+        tokens=tokens,
+        start_height=start_height,
+        end_height=end_height,
+    )
 
-    db_crud.update_block_state(
-        current_height=target_start_height
+    # the whole window lands in one transaction so that a crash never leaves
+    # activities behind without the matching scanned heights
+    await db_writer.submit(
+        crud.DBCrud.ingest_activity_window,
+        activities=window_activities,
+        current_height=end_height if is_tip else None,
+        asset_ids=[f"0x{token.tail_program_hash.hex()}" for token in tokens],
+        header_hashes=header_hashes,
+        scanned_height=end_height,
     )
-    return True
 
 
-@router.on_event("startup")
-@repeat_every(seconds=60, logger=logger)
-@disallow([ExecutionMode.REGISTRY, ExecutionMode.CLIENT])
-async def scan_token_activity() -> None:
-    if lock.locked():
+async def _run_scan_token_activity(wait: bool = False) -> None:
+    """Scan until synced, unless a scan is already running; with `wait`, the scan
+    runs once the running one ends instead."""
+
+    if (not is_scanner_leader) or (lock.locked() and not wait):
         return
 
     async with (
@@ -123,17 +490,24 @@ async def scan_token_activity() -> None:
         as_async_contextmanager(deps.get_full_node_rpc_client) as full_node_client,
     ):
 
-        db_crud = crud.DBCrud(db=db)
-        climate_warehouse = crud.ClimateWareHouseCrud(url=settings.CADT_API_SERVER_HOST, api_key=settings.CADT_API_KEY)
+        db_crud = crud.AsyncDBCrud(db=db)
+        climate_warehouse = crud.ClimateWareHouseCrud(
+            url=settings.CADT_API_SERVER_HOST, api_key=settings.CADT_API_KEY
+        )
         blockchain = crud.BlockChainCrud(full_node_client=full_node_client)
 
         try:
-            while await _scan_token_activity(
-                db_crud=db_crud,
-                climate_warehouse=climate_warehouse,
-                blockchain=blockchain,
-            ):
-                pass
+            # the lease is renewed in the background, so a scanner that lost it
+            # stops catching up before writing another window
+            while is_scanner_leader:
+                if not await _scan_token_activity(
+                    db_crud=db_crud,
+                    climate_warehouse=climate_warehouse,
+                    blockchain=blockchain,
+                ):
+                    break
+            else:
+                logger.info("Lost the scanner lease, stop scanning.")
 
         except TimeoutError as e:
             logger.error("Call API Time Out, ErrorMessage: " + str(e))
@@ -148,8 +522,118 @@ async def scan_token_activity() -> None:
             raise errorcode.internal_server_error(message="Get Retire Token Failure")
 
 
+@router.on_event("startup")
+@repeat_every(seconds=60, logger=logger)
+@disallow([ExecutionMode.REGISTRY, ExecutionMode.CLIENT])
+async def scan_token_activity() -> None:
+    await _run_scan_token_activity()
+
+
+async def _sync_climate_warehouse(
+    climate_warehouse: crud.ClimateWareHouseCrud,
+) -> Dict[str, int]:
+    climate_units: List[
+        Dict
+    ] = await climate_warehouse.combine_climate_units_and_metadata(search={})
+
+    # an outage of the climate warehouse looks the same as no units, and must not
+    # wipe the mirror
+    if len(climate_units) == 0:
+        logger.warning("No units in climate warehouse, keeping the mirrored data")
+        return {}
+
+    return await db_writer.submit(
+        crud.DBCrud.sync_climate_warehouse, climate_units=climate_units
+    )
+
+
+@router.on_event("startup")
+@repeat_every(seconds=settings.CADT_SYNC_INTERVAL, logger=logger)
+@disallow([ExecutionMode.REGISTRY, ExecutionMode.CLIENT])
+async def sync_climate_warehouse() -> None:
+    if not is_scanner_leader:
+        return
+
+    climate_warehouse = crud.ClimateWareHouseCrud(
+        url=settings.CADT_API_SERVER_HOST, api_key=settings.CADT_API_KEY
+    )
+
+    try:
+        num_rows_by_table: Dict[str, int] = await _sync_climate_warehouse(
+            climate_warehouse=climate_warehouse
+        )
+    except Exception as e:
+        # the explorer keeps serving the last mirrored data
+        logger.error(f"Sync climate warehouse failure, ErrorMessage: {e}")
+        return
+
+    if any(num_rows_by_table.values()):
+        logger.info(f"Synced climate warehouse: {num_rows_by_table}")
+
+
+@router.get("/scanner", response_model=schemas.ScannerState)
+@disallow([ExecutionMode.REGISTRY, ExecutionMode.CLIENT])
+async def get_scanner_state():
+    """Get the current scan window size and throughput of the activity scanner."""
+
+    return scan_window.to_schema()
+
+
+async def _on_new_peak(height: int) -> None:
+    if not is_scanner_leader:
+        return
+
+    await db_writer.submit(crud.DBCrud.update_block_state, peak_height=height)
+
+    scan_event.set()
+
+
+async def _scan_on_new_peak() -> None:
+    while True:
+        await scan_event.wait()
+        scan_event.clear()
+
+        # a peak reported during a running scan is scanned right after it
+        try:
+            await _run_scan_token_activity(wait=True)
+        except Exception as e:
+            logger.error(f"Scan on new peak failure, ErrorMessage: {e}")
+
+
+@router.on_event("startup")
+@disallow([ExecutionMode.REGISTRY, ExecutionMode.CLIENT])
+async def watch_new_peaks() -> None:
+    global peak_watcher, scan_on_new_peak_task
+
+    if not (settings.SCANNER_ENABLED and settings.SCAN_ON_NEW_PEAK):
+        return
+
+    # polling stays on as a fallback for when the daemon is not reachable
+    try:
+        peak_watcher = deps.create_peak_watcher(on_peak=_on_new_peak)
+    except Exception as e:
+        logger.warning(f"Can not watch new peaks, falling back to polling: {e}")
+        return
+
+    peak_watcher.start()
+    scan_on_new_peak_task = asyncio.create_task(_scan_on_new_peak())
+
+
+@router.on_event("shutdown")
+async def close_peak_watcher() -> None:
+    global peak_watcher, scan_on_new_peak_task
+
+    if peak_watcher is not None:
+        await peak_watcher.close()
+        peak_watcher = None
+
+    if scan_on_new_peak_task is not None:
+        scan_on_new_peak_task.cancel()
+        scan_on_new_peak_task = None
+
+
 async def _scan_blockchain_state(
-    db_crud: crud.DBCrud,
+    db_crud: crud.AsyncDBCrud,
     full_node_client: FullNodeRpcClient,
 ):
     state: Dict = await full_node_client.get_blockchain_state()
@@ -160,19 +644,24 @@ async def _scan_blockchain_state(
         return
 
     peak_block_record = BlockRecord.from_json_dict(peak)
-    db_crud.update_block_state(peak_height=peak_block_record.height)
+    await db_writer.submit(
+        crud.DBCrud.update_block_state, peak_height=peak_block_record.height
+    )
 
 
 @router.on_event("startup")
 @repeat_every(seconds=10, logger=logger)
 @disallow([ExecutionMode.REGISTRY, ExecutionMode.CLIENT])
 async def scan_blockchain_state() -> None:
+    if not is_scanner_leader:
+        return
+
     async with (
         as_async_contextmanager(deps.get_db_session) as db,
         as_async_contextmanager(deps.get_full_node_rpc_client) as full_node_client,
     ):
 
-        db_crud = crud.DBCrud(db=db)
+        db_crud = crud.AsyncDBCrud(db=db)
 
         try:
             await _scan_blockchain_state(
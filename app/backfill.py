@@ -0,0 +1,221 @@
+"""Backfill activities from `BLOCK_START` in parallel, e.g.
+
+    MODE=explorer python -m app.backfill --workers 8 --shard-size 100000
+
+The blocks `[BLOCK_START, peak + 1 - REORG_DEPTH)` are split into shards that are
+scanned by a set of async workers. Every window of a shard is checkpointed together
+with its activities, so an interrupted backfill resumes where it stopped. Once all
+shards are scanned, the backfilled tokens are handed over to the scanner of the
+explorer at the joined height.
+The backfill holds the scanner lease while it runs, so the explorer's scanner stands
+by until the backfill releases it.
+"""
+
+import argparse
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from chia.consensus.block_record import BlockRecord
+
+from app import crud, models
+from app.api import dependencies as deps
+from app.api.v1 import cron
+from app.config import settings
+from app.core.types import ClimateToken
+from app.db.writer import db_writer
+from app.logger import logger
+from app.utils import as_async_contextmanager
+
+
+def split_shards(
+    start_height: int,
+    end_height: int,
+    shard_size: int,
+) -> List[Tuple[int, int]]:
+    return [
+        (height, min(height + shard_size, end_height))
+        for height in range(start_height, end_height, shard_size)
+    ]
+
+
+async def backfill_shard(
+    shard: models.BackfillShard,
+    blockchain: crud.BlockChainCrud,
+    tokens: List[ClimateToken],
+    window_size: int,
+) -> None:
+    start_height: int = shard.scanned_height
+    while start_height < shard.end_height:
+        end_height: int = min(start_height + window_size, shard.end_height)
+
+        activities = await cron.scan_tokens(
+            blockchain=blockchain,
+            tokens=tokens,
+            start_height=start_height,
+            end_height=end_height,
+        )
+        await db_writer.submit(
+            crud.DBCrud.ingest_backfill_window,
+            activities=activities,
+            shard_id=shard.id,
+            scanned_height=end_height,
+        )
+
+        logger.info(
+            f"Backfilled blocks {start_height} - {end_height} of shard "
+            f"{shard.start_height} - {shard.end_height}"
+        )
+        start_height = end_height
+
+
+async def renew_scanner_lease() -> None:
+    """Renew the scanner lease until cancelled, and raise once it is lost."""
+
+    while True:
+        await asyncio.sleep(max(settings.SCANNER_LEASE_SECONDS // 3, 1))
+        if not await cron.acquire_scanner_lease():
+            raise RuntimeError("Lost the scanner lease to another process")
+
+
+async def backfill(workers: int, shard_size: int, window_size: int) -> int:
+    """Run or resume a backfill while holding the scanner lease, and return the
+    joined height.
+    """
+
+    await cron.init_db()
+
+    if not await cron.acquire_scanner_lease():
+        raise ValueError("Scanner lease is held by another process")
+
+    lease_task: asyncio.Task = asyncio.create_task(renew_scanner_lease())
+    backfill_task: asyncio.Task = asyncio.create_task(
+        _backfill(workers=workers, shard_size=shard_size, window_size=window_size)
+    )
+
+    try:
+        done, _ = await asyncio.wait(
+            {lease_task, backfill_task}, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        for task in (lease_task, backfill_task):
+            task.cancel()
+        await asyncio.gather(lease_task, backfill_task, return_exceptions=True)
+
+        # the explorer's scanner takes over without waiting for the lease to expire
+        await cron.release_scanner_lease()
+
+    if backfill_task in done:
+        return backfill_task.result()
+
+    raise lease_task.exception()
+
+
+async def _backfill(workers: int, shard_size: int, window_size: int) -> int:
+    async with (
+        as_async_contextmanager(deps.get_db_session) as db,
+        as_async_contextmanager(deps.get_full_node_rpc_client) as full_node_client,
+    ):
+        db_crud = crud.AsyncDBCrud(db=db)
+        blockchain = crud.BlockChainCrud(full_node_client=full_node_client)
+
+        shards: List[models.BackfillShard] = await db_crud.select_backfill_shards()
+        if len(shards) == 0:
+            climate_warehouse = crud.ClimateWareHouseCrud(
+                url=settings.CADT_API_SERVER_HOST, api_key=settings.CADT_API_KEY
+            )
+            climate_units: List[
+                Dict
+            ] = await climate_warehouse.combine_climate_units_and_metadata(search={})
+            await cron.get_tokens(db_crud=db_crud, climate_units=climate_units)
+
+            max_token_id: Optional[int] = await db_crud.select_max_token_id()
+            if max_token_id is None:
+                raise ValueError("No tokens to backfill in climate warehouse")
+
+            state: Dict = await full_node_client.get_blockchain_state()
+            peak: Optional[Dict] = state.get("peak")
+            if peak is None:
+                raise ValueError("Full node is not synced")
+
+            # the latest blocks are left to the scanner, which also tracks reorgs
+            peak_height: int = BlockRecord.from_json_dict(peak).height
+            joined_height: int = max(
+                peak_height + 1 - settings.REORG_DEPTH, settings.BLOCK_START
+            )
+
+            await db_writer.submit(
+                crud.DBCrud.create_backfill_shards,
+                heights=split_shards(settings.BLOCK_START, joined_height, shard_size),
+                max_token_id=max_token_id,
+            )
+            shards = await db_crud.select_backfill_shards()
+            if len(shards) == 0:
+                logger.info(f"Nothing to backfill below {joined_height}")
+                return joined_height
+
+            logger.info(
+                f"Planned backfill of blocks {settings.BLOCK_START} - {joined_height} "
+                f"in {len(shards)} shards"
+            )
+
+        max_token_id = shards[0].max_token_id
+        joined_height = shards[-1].end_height
+        tokens: List[ClimateToken] = await db_crud.select_tokens(
+            max_token_id=max_token_id
+        )
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for shard in shards:
+            if shard.scanned_height < shard.end_height:
+                queue.put_nowait(shard)
+
+        logger.info(
+            f"Backfilling {queue.qsize()} of {len(shards)} shards for "
+            f"{len(tokens)} tokens with {workers} workers"
+        )
+
+        async def _worker() -> None:
+            while not queue.empty():
+                shard: models.BackfillShard = queue.get_nowait()
+                await backfill_shard(
+                    shard=shard,
+                    blockchain=blockchain,
+                    tokens=tokens,
+                    window_size=window_size,
+                )
+
+        try:
+            await asyncio.gather(*[_worker() for _ in range(workers)])
+        finally:
+            await db_writer.close()
+
+        await db_crud.finish_backfill(
+            joined_height=joined_height, max_token_id=max_token_id
+        )
+        logger.info(f"Backfill finished, the scanner takes over at {joined_height}")
+
+    return joined_height
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Backfill activities from `BLOCK_START` in parallel."
+    )
+    parser.add_argument("--workers", type=int, default=settings.BACKFILL_WORKERS)
+    parser.add_argument("--shard-size", type=int, default=settings.BACKFILL_SHARD_SIZE)
+    parser.add_argument("--window-size", type=int, default=settings.BLOCK_RANGE)
+    args = parser.parse_args()
+
+    try:
+        await backfill(
+            workers=args.workers,
+            shard_size=args.shard_size,
+            window_size=args.window_size,
+        )
+    finally:
+        await deps.close_rpc_clients()
+        await crud.close_climate_warehouse_session()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
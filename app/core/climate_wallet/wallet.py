@@ -1,3 +1,4 @@
+import asyncio
 import dataclasses
 import time
 from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
@@ -35,6 +36,7 @@ from app.core.climate_wallet.wallet_utils import (
 from app.core.derive_keys import root_sk_to_gateway_sk
 from app.core.types import (
     CLIMATE_WALLET_INDEX,
+    ClimateToken,
     ClimateTokenIndex,
     GatewayMode,
     TransactionRequest,
@@ -645,19 +647,49 @@ class ClimateWallet(ClimateWalletBase):
 @dataclasses.dataclass
 class ClimateObserverWallet(ClimateWalletBase):
     full_node_client: FullNodeRpcClient
+    # precomputed from the token registry to skip currying the tail and gateway puzzles
+    known_tail_program_hash: Optional[bytes32] = dataclasses.field(
+        default=None, kw_only=True
+    )
+    known_gateway_cat_puzzle_hash: Optional[bytes32] = dataclasses.field(
+        default=None, kw_only=True
+    )
 
-    async def get_activities(
-        self,
-        mode: Optional[GatewayMode] = None,
-        start_height: Optional[int] = None,
-        end_height: Optional[int] = None,
-    ) -> List[Dict]:
+    @classmethod
+    def from_token(
+        cls,
+        token: ClimateToken,
+        full_node_client: FullNodeRpcClient,
+    ) -> "ClimateObserverWallet":
+
+        return ClimateObserverWallet(
+            token_index=token.token_index,
+            root_public_key=token.root_public_key,
+            full_node_client=full_node_client,
+            known_tail_program_hash=token.tail_program_hash,
+            known_gateway_cat_puzzle_hash=token.gateway_cat_puzzle_hash,
+        )
 
-        modes: List[GatewayMode]
-        if mode is None:
-            modes = list(GatewayMode)
-        else:
-            modes = [mode]
+    @property
+    def token(self) -> ClimateToken:
+        return ClimateToken(
+            token_index=self.token_index,
+            root_public_key=self.root_public_key,
+            tail_program_hash=self.tail_program_hash,
+            gateway_cat_puzzle_hash=self.gateway_cat_puzzle_hash,
+        )
+
+    @property
+    def tail_program_hash(self) -> bytes32:
+        if self.known_tail_program_hash is not None:
+            return self.known_tail_program_hash
+
+        return super().tail_program_hash
+
+    @property
+    def gateway_cat_puzzle_hash(self) -> bytes32:
+        if self.known_gateway_cat_puzzle_hash is not None:
+            return self.known_gateway_cat_puzzle_hash
 
         gateway_puzzle: Program = create_gateway_puzzle()
         gateway_cat_puzzle: Program = construct_cat_puzzle(
@@ -665,66 +697,166 @@ class ClimateObserverWallet(ClimateWalletBase):
             limitations_program_hash=self.tail_program_hash,
             inner_puzzle=gateway_puzzle,
         )
-        gateway_cat_puzzle_hash: bytes32 = gateway_cat_puzzle.get_tree_hash()
+        return gateway_cat_puzzle.get_tree_hash()
 
+    @staticmethod
+    async def get_coin_records_by_wallets(
+        full_node_client: FullNodeRpcClient,
+        wallets: List["ClimateObserverWallet"],
+        start_height: Optional[int] = None,
+        end_height: Optional[int] = None,
+    ) -> List[List[CoinRecord]]:
+        """Fetch the gateway coin records of several wallets in one RPC call.
+
+        Coin records are mapped back to their wallet by puzzle hash, and returned in
+        the order of `wallets`.
+        """
+
+        puzzle_hashes: List[bytes32] = [
+            wallet.gateway_cat_puzzle_hash for wallet in wallets
+        ]
         coin_records: List[
             CoinRecord
-        ] = await self.full_node_client.get_coin_records_by_puzzle_hash(
-            puzzle_hash=gateway_cat_puzzle_hash,
+        ] = await full_node_client.get_coin_records_by_puzzle_hashes(
+            puzzle_hashes=list(set(puzzle_hashes)),
             start_height=start_height,
             end_height=end_height,
         )
 
-        activities: List[Dict] = []
+        coin_records_by_puzzle_hash: Dict[bytes32, List[CoinRecord]] = {
+            puzzle_hash: [] for puzzle_hash in puzzle_hashes
+        }
         for coin_record in coin_records:
+            coin_records_by_puzzle_hash[coin_record.coin.puzzle_hash].append(
+                coin_record
+            )
+
+        return [
+            coin_records_by_puzzle_hash[puzzle_hash] for puzzle_hash in puzzle_hashes
+        ]
+
+    async def get_activities(
+        self,
+        mode: Optional[GatewayMode] = None,
+        start_height: Optional[int] = None,
+        end_height: Optional[int] = None,
+        max_in_flight: int = 16,
+    ) -> List[Dict]:
+
+        coin_records: List[
+            CoinRecord
+        ] = await self.full_node_client.get_coin_records_by_puzzle_hash(
+            puzzle_hash=self.gateway_cat_puzzle_hash,
+            start_height=start_height,
+            end_height=end_height,
+        )
+
+        return await self.get_activities_from_coin_records(
+            coin_records=coin_records,
+            mode=mode,
+            max_in_flight=max_in_flight,
+        )
+
+    async def get_activities_from_coin_records(
+        self,
+        coin_records: List[CoinRecord],
+        mode: Optional[GatewayMode] = None,
+        max_in_flight: int = 16,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> List[Dict]:
+        """Fetch and parse the spends of `coin_records`.
+
+        Up to `max_in_flight` `get_puzzle_and_solution` calls are pipelined, and each
+        spend is parsed as soon as it arrives. Activities keep the order of
+        `coin_records`. Passing `semaphore` instead bounds the calls of several
+        wallets together.
+        """
+
+        modes: List[GatewayMode]
+        if mode is None:
+            modes = list(GatewayMode)
+        else:
+            modes = [mode]
+
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max_in_flight)
+
+        async def _get_activity(coin_record: CoinRecord) -> Optional[Dict]:
             coin: Coin = coin_record.coin
             height: int = coin_record.spent_block_index
 
-            coin_spend: CoinSpend = await self.full_node_client.get_puzzle_and_solution(
-                coin_id=coin.name(),
-                height=height,
+            async with semaphore:
+                coin_spend: CoinSpend = (
+                    await self.full_node_client.get_puzzle_and_solution(
+                        coin_id=coin.name(),
+                        height=height,
+                    )
+                )
+
+            return self._parse_activity(
+                coin_record=coin_record,
+                coin_spend=coin_spend,
+                modes=modes,
             )
 
-            mode: GatewayMode
-            tail_spend: CoinSpend
-            (mode, tail_spend) = parse_gateway_spend(coin_spend=coin_spend, is_cat=True)
+        tasks: List[asyncio.Task] = [
+            asyncio.create_task(_get_activity(coin_record))
+            for coin_record in coin_records
+        ]
+        try:
+            results: List[Optional[Dict]] = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
 
-            if mode not in modes:
-                continue
+        return [activity for activity in results if activity is not None]
 
-            tail_solution: Program = tail_spend.solution.to_program()
-            delegated_solution: Program = tail_solution.at("r")
-            key_value_pairs: Program = delegated_solution.at("f")
+    def _parse_activity(
+        self,
+        coin_record: CoinRecord,
+        coin_spend: CoinSpend,
+        modes: List[GatewayMode],
+    ) -> Optional[Dict]:
 
-            metadata: Dict[bytes, bytes] = {}
-            for key_value_pair in key_value_pairs.as_iter():
-                if (not key_value_pair.listp()) or (key_value_pair.at("r").listp()):
-                    logger.warning(
-                        f"Coin {coin.name()} has incorrect metadata structure"
-                    )
-                    continue
+        coin: Coin = coin_record.coin
 
-                key: bytes = key_value_pair.at("f").as_atom()
-                value: bytes = key_value_pair.at("r").as_atom()
+        mode: GatewayMode
+        tail_spend: CoinSpend
+        (mode, tail_spend) = parse_gateway_spend(coin_spend=coin_spend, is_cat=True)
 
-                key = key.decode()
-                if key in ["bp"]:
-                    value = f"0x{value.hex()}"
+        if mode not in modes:
+            return None
 
-                elif key in ["ba", "bn"]:
-                    value = value.decode()
+        tail_solution: Program = tail_spend.solution.to_program()
+        delegated_solution: Program = tail_solution.at("r")
+        key_value_pairs: Program = delegated_solution.at("f")
 
-                else:
-                    raise ValueError(f"Unknown key '{key}'!")
+        metadata: Dict[bytes, bytes] = {}
+        for key_value_pair in key_value_pairs.as_iter():
+            if (not key_value_pair.listp()) or (key_value_pair.at("r").listp()):
+                logger.warning(f"Coin {coin.name()} has incorrect metadata structure")
+                continue
 
-                metadata[key] = value
+            key: bytes = key_value_pair.at("f").as_atom()
+            value: bytes = key_value_pair.at("r").as_atom()
 
-            activity: Dict = {
-                "coin_record": coin_record,
-                "coin_spend": coin_spend,
-                "mode": mode,
-                "metadata": metadata,
-            }
-            activities.append(activity)
+            key = key.decode()
+            if key in ["bp"]:
+                value = f"0x{value.hex()}"
 
-        return activities
+            elif key in ["ba", "bn"]:
+                value = value.decode()
+
+            else:
+                raise ValueError(f"Unknown key '{key}'!")
+
+            metadata[key] = value
+
+        activity: Dict = {
+            "coin_record": coin_record,
+            "coin_spend": coin_spend,
+            "mode": mode,
+            "metadata": metadata,
+        }
+        return activity
@@ -2,6 +2,7 @@ import dataclasses
 import enum
 from typing import Dict, List, Optional
 
+from blspy import G1Element
 from chia.types.announcement import Announcement
 from chia.types.blockchain_format.coin import Coin
 from chia.types.blockchain_format.program import Program
@@ -43,6 +44,16 @@ class ClimateTokenIndex(object):
         ).get_tree_hash()
 
 
+@dataclasses.dataclass(frozen=True)
+class ClimateToken(object):
+    """A token with its puzzle hashes precomputed, as kept in the token registry."""
+
+    token_index: ClimateTokenIndex
+    root_public_key: G1Element
+    tail_program_hash: bytes32
+    gateway_cat_puzzle_hash: bytes32
+
+
 @dataclasses.dataclass(frozen=True)
 class TransactionRequest(object):
     coins: Optional[List[Coin]] = dataclasses.field(default=None)
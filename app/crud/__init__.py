@@ -1,2 +1,7 @@
-from app.crud.chia import BlockChainCrud, ClimateWareHouseCrud  # noqa
-from app.crud.db import DBCrud, DBCrudBase  # noqa
+from app.crud.chia import (  # noqa
+    BlockChainCrud,
+    ClimateWareHouseCrud,
+    climate_warehouse_cache,
+    close_climate_warehouse_session,
+)
+from app.crud.db import AsyncDBCrud, DBCrud, DBCrudBase  # noqa
@@ -1,9 +1,21 @@
+import asyncio
 import dataclasses
 import json
-from typing import Any, Dict, List, Optional
-from urllib.parse import urlencode, urlparse
-
-import requests
+import time
+from http import HTTPStatus
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+from urllib.parse import urlparse
+
+import aiohttp
 from blspy import G1Element
 from chia.rpc.full_node_rpc_client import FullNodeRpcClient
 from chia.types.blockchain_format.coin import Coin
@@ -13,18 +25,202 @@ from fastapi.encoders import jsonable_encoder
 from app import schemas
 from app.config import settings
 from app.core.climate_wallet.wallet import ClimateObserverWallet
-from app.core.types import ClimateTokenIndex, GatewayMode
+from app.core.types import ClimateToken, ClimateTokenIndex, GatewayMode
 from app.errors import ErrorCode
 from app.logger import logger
 from app.core.utils import add_0x_prefix
 
 error_code = ErrorCode()
 
+# unit fields served by the explorer, which leaves out e.g. `labels`
+CLIMATE_UNIT_FIELDS: Tuple[str, ...] = (
+    "warehouseUnitId",
+    "issuanceId",
+    "projectLocationId",
+    "orgUid",
+    "unitOwner",
+    "countryJurisdictionOfOwner",
+    "inCountryJurisdictionOfOwner",
+    "serialNumberBlock",
+    "unitBlockStart",
+    "unitBlockEnd",
+    "unitCount",
+    "vintageYear",
+    "unitType",
+    "marketplace",
+    "marketplaceLink",
+    "marketplaceIdentifier",
+    "unitTags",
+    "unitStatus",
+    "unitStatusReason",
+    "unitRegistryLink",
+    "correspondingAdjustmentDeclaration",
+    "correspondingAdjustmentStatus",
+    "timeStaged",
+    "createdAt",
+    "updatedAt",
+    "issuance",
+)
+
+
+@dataclasses.dataclass
+class ClimateWareHouseSessionManager(object):
+    """Owns one keep-alive HTTP session shared by every CADT call.
+
+    The session is created lazily on first use in the running event loop, and its
+    connection pool is shared by every request and cron task of that loop.
+    """
+
+    pool_size: int = settings.CADT_POOL_SIZE
+
+    _session: Optional[aiohttp.ClientSession] = dataclasses.field(
+        default=None, init=False
+    )
+    _loop: Optional[asyncio.AbstractEventLoop] = dataclasses.field(
+        default=None, init=False
+    )
+
+    def get_session(self) -> aiohttp.ClientSession:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+        if (self._session is None) or self._session.closed or (self._loop is not loop):
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+            )
+            self._loop = loop
+
+        return self._session
+
+    async def close(self) -> None:
+        session: Optional[aiohttp.ClientSession] = self._session
+        self._session = None
+        self._loop = None
+
+        if (session is not None) and (not session.closed):
+            await session.close()
+
+
+climate_warehouse_session_manager = ClimateWareHouseSessionManager()
+
+
+@dataclasses.dataclass
+class CacheEntry(object):
+    value: Any
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # in `time.monotonic()` seconds
+    expires_at: float = 0.0
+
+
+@dataclasses.dataclass
+class ClimateWareHouseCache(object):
+    """Shared in-process cache of climate warehouse responses.
+
+    Fresh entries are served from memory. An expired entry is still served while a
+    single background call revalidates it with `If-None-Match`/`If-Modified-Since`,
+    so that callers only wait for the climate warehouse on a cold miss, and
+    concurrent misses of the same key share one call.
+    """
+
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    # refreshes answered with `304 Not Modified`
+    revalidations: int = 0
+
+    _entries: Dict[Tuple, CacheEntry] = dataclasses.field(
+        default_factory=dict, init=False
+    )
+    _tasks: Dict[Tuple, asyncio.Task] = dataclasses.field(
+        default_factory=dict, init=False
+    )
+
+    def to_schema(self) -> schemas.ClimateWareHouseCacheState:
+        return schemas.ClimateWareHouseCacheState(
+            entries=len(self._entries),
+            hits=self.hits,
+            stale_hits=self.stale_hits,
+            misses=self.misses,
+            revalidations=self.revalidations,
+        )
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tasks.clear()
+
+    async def get(
+        self,
+        key: Tuple,
+        ttl: float,
+        fetch: Callable[[Optional[CacheEntry]], Awaitable[CacheEntry]],
+    ) -> Any:
+        entry: Optional[CacheEntry] = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            # a cancelled caller does not cancel the call shared by other callers
+            return await asyncio.shield(self._refresh(key, ttl, fetch))
+
+        if entry.expires_at > time.monotonic():
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+            self._refresh(key, ttl, fetch)
+
+        return entry.value
+
+    def _refresh(
+        self,
+        key: Tuple,
+        ttl: float,
+        fetch: Callable[[Optional[CacheEntry]], Awaitable[CacheEntry]],
+    ) -> asyncio.Task:
+        task: Optional[asyncio.Task] = self._tasks.get(key)
+        if task is not None and not task.done():
+            return task
+
+        task = asyncio.create_task(self._fetch(key, ttl, fetch))
+        task.add_done_callback(self._on_refreshed)
+        self._tasks[key] = task
+        return task
+
+    async def _fetch(
+        self,
+        key: Tuple,
+        ttl: float,
+        fetch: Callable[[Optional[CacheEntry]], Awaitable[CacheEntry]],
+    ) -> Any:
+        stale_entry: Optional[CacheEntry] = self._entries.get(key)
+
+        entry: CacheEntry = await fetch(stale_entry)
+        if entry is stale_entry:
+            self.revalidations += 1
+
+        entry.expires_at = time.monotonic() + ttl
+        self._entries[key] = entry
+
+        return entry.value
+
+    @staticmethod
+    def _on_refreshed(task: asyncio.Task) -> None:
+        # stale entries are kept when a background refresh fails
+        if (not task.cancelled()) and (task.exception() is not None):
+            logger.warning(f"Refresh climate warehouse cache failure: {task.exception()}")
+
+
+climate_warehouse_cache = ClimateWareHouseCache()
+
+
+async def close_climate_warehouse_session() -> None:
+    await climate_warehouse_session_manager.close()
+
 
 @dataclasses.dataclass
 class ClimateWareHouseCrud(object):
     url: str
-    api_key: Optional[str]
+    api_key: Optional[str] = None
+    # in seconds, for each call
+    timeout: float = settings.CADT_TIMEOUT
 
     def _headers(self) -> Dict[str, str]:
         headers = {}
@@ -34,153 +230,302 @@ class ClimateWareHouseCrud(object):
 
         return headers
 
-    def get_climate_units(self, search: Dict[str, Any]) -> List[Dict]:
+    async def _get(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        entry: Optional[CacheEntry] = None,
+    ) -> CacheEntry:
+        """Call the climate warehouse, or revalidate `entry` if it is given.
+
+        Returns `entry` itself if the climate warehouse reports it as not modified.
+        """
+
+        session: aiohttp.ClientSession = climate_warehouse_session_manager.get_session()
+        url = urlparse(self.url + path)
+
+        headers: Dict[str, str] = self._headers()
+        if entry is not None:
+            if entry.etag is not None:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified is not None:
+                headers["If-Modified-Since"] = entry.last_modified
+
         try:
-            params = urlencode(search)
-            url = urlparse(self.url + "/v1/units")
-
-            r = requests.get(url.geturl(), params=params, headers=self._headers())
-            if r.status_code != requests.codes.ok:
-                logger.error(f"Request Url: {r.url} Error Message: {r.text}")
-                raise error_code.internal_server_error(
-                    message="Call Climate API Failure"
+            async with session.get(
+                url.geturl(),
+                params=params,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=timeout or self.timeout),
+            ) as r:
+                if (entry is not None) and (r.status == HTTPStatus.NOT_MODIFIED):
+                    return entry
+
+                if r.status != HTTPStatus.OK:
+                    logger.error(f"Request Url: {r.url} Error Message: {await r.text()}")
+                    raise error_code.internal_server_error(
+                        message="Call Climate API Failure"
+                    )
+
+                return CacheEntry(
+                    value=await r.json(content_type=None),
+                    etag=r.headers.get("ETag"),
+                    last_modified=r.headers.get("Last-Modified"),
                 )
 
-            return r.json()
-
-        except TimeoutError as e:
+        except asyncio.TimeoutError as e:
             logger.error("Call Climate API Timeout, ErrorMessage: " + str(e))
             raise error_code.internal_server_error("Call Climate API Timeout")
 
-    def get_climate_projects(self) -> List[Dict]:
-        try:
-            url = urlparse(self.url + "/v1/projects")
+        except aiohttp.ClientError as e:
+            logger.error("Call Climate API Failure, ErrorMessage: " + str(e))
+            raise error_code.internal_server_error("Call Climate API Failure")
 
-            r = requests.get(url.geturl(), headers=self._headers())
-            if r.status_code != requests.codes.ok:
-                logger.error(f"Request Url: {r.url} Error Message: {r.text}")
-                raise error_code.internal_server_error(
-                    message="Call Climate API Failure"
+    async def _get_cached(
+        self,
+        path: str,
+        ttl: float,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        if ttl <= 0:
+            return (await self._get(path, params=params, timeout=timeout)).value
+
+        async def _fetch(entry: Optional[CacheEntry]) -> CacheEntry:
+            return await self._get(path, params=params, timeout=timeout, entry=entry)
+
+        return await climate_warehouse_cache.get(
+            key=(self.url, path, tuple(sorted((params or {}).items()))),
+            ttl=ttl,
+            fetch=_fetch,
+        )
+
+    async def iter_climate_unit_pages(
+        self,
+        search: Dict[str, Any],
+        page_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[List[Dict]]:
+        """Download units page by page with the `page` and `limit` parameters."""
+
+        page: int = 1
+        while True:
+            result: Any = (
+                await self._get(
+                    "/v1/units",
+                    params=search
+                    | {"page": page, "limit": page_size or settings.CADT_PAGE_SIZE},
+                    timeout=timeout,
                 )
+            ).value
 
-            return r.json()
+            # servers without pagination return all units at once
+            if isinstance(result, list):
+                if len(result) != 0:
+                    yield result
+                return
 
-        except TimeoutError as e:
-            logger.error("Call Climate API Timeout, ErrorMessage: " + str(e))
-            raise error_code.internal_server_error("Call Climate API Timeout")
+            units: List[Dict] = result.get("data") or []
+            if len(units) != 0:
+                yield units
 
-    def get_climate_organizations(self) -> Dict[str, Dict]:
-        try:
-            url = urlparse(self.url + "/v1/organizations")
+            if (len(units) == 0) or (page >= result.get("pageCount", page)):
+                return
 
-            r = requests.get(url.geturl(), headers=self._headers())
-            if r.status_code != requests.codes.ok:
-                logger.error(f"Request Url: {r.url} Error Message: {r.text}")
-                raise error_code.internal_server_error(
-                    message="Call Climate API Failure"
-                )
+            page += 1
 
-            return r.json()
+    async def iter_climate_units(
+        self,
+        search: Dict[str, Any],
+        page_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Dict]:
+        async for units in self.iter_climate_unit_pages(
+            search, page_size=page_size, timeout=timeout
+        ):
+            for unit in units:
+                yield unit
+
+    async def get_climate_units(
+        self,
+        search: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> List[Dict]:
+        return [
+            unit async for unit in self.iter_climate_units(search, timeout=timeout)
+        ]
+
+    async def get_climate_projects(self, timeout: Optional[float] = None) -> List[Dict]:
+        return await self._get_cached(
+            "/v1/projects", ttl=settings.CADT_PROJECTS_TTL, timeout=timeout
+        )
 
-        except TimeoutError as e:
-            logger.error("Call Climate API Timeout, ErrorMessage: " + str(e))
-            raise error_code.internal_server_error("Call Climate API Timeout")
+    async def get_climate_organizations(
+        self,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Dict]:
+        return await self._get_cached(
+            "/v1/organizations", ttl=settings.CADT_ORGANIZATIONS_TTL, timeout=timeout
+        )
 
-    def get_climate_organizations_metadata(self, org_uid: str) -> Dict[str, Dict]:
-        try:
-            condition = {"orgUid": org_uid}
+    async def get_climate_organizations_metadata(
+        self,
+        org_uid: str,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Dict]:
+        condition = {"orgUid": org_uid}
+
+        return await self._get_cached(
+            "/v1/organizations/metadata",
+            ttl=settings.CADT_METADATA_TTL,
+            params=condition,
+            timeout=timeout,
+        )
 
-            params = urlencode(condition)
-            url = urlparse(self.url + "/v1/organizations/metadata")
+    async def get_climate_organizations_metadata_by_id(
+        self,
+        org_uids: List[str],
+        concurrency: Optional[int] = None,
+    ) -> Dict[str, Dict[str, str]]:
+        semaphore = asyncio.Semaphore(
+            concurrency or settings.CADT_METADATA_CONCURRENCY
+        )
 
-            r = requests.get(url.geturl(), params=params, headers=self._headers())
-            if r.status_code != requests.codes.ok:
-                logger.error(f"Request Url: {r.url} Error Message: {r.text}")
-                raise error_code.internal_server_error(
-                    message="Call Climate API Failure"
-                )
+        async def _get_metadata(org_uid: str) -> Dict[str, str]:
+            async with semaphore:
+                return await self.get_climate_organizations_metadata(org_uid)
 
-            return r.json()
+        metadatas: List[Dict[str, str]] = await asyncio.gather(
+            *[_get_metadata(org_uid) for org_uid in org_uids]
+        )
+        return dict(zip(org_uids, metadatas))
 
-        except TimeoutError as e:
-            logger.error("Call Climate API Timeout, ErrorMessage: " + str(e))
-            raise error_code.internal_server_error("Call Climate API Timeout")
+    async def combine_climate_units_and_metadata(
+        self,
+        search: Dict[str, Any],
+    ) -> List[Dict]:
+        unit_pages: AsyncIterator[List[Dict]] = self.iter_climate_unit_pages(search)
 
-    def combine_climate_units_and_metadata(self, search: Dict[str, Any]) -> List[Dict]:
         # units: [unit]
-        units: List[Dict] = self.get_climate_units(search)
+        units: List[Dict] = await anext(unit_pages, [])
         if len(units) == 0:
             logger.warning(
                 f"Search climate warehouse units by search is empty. search:{search}"
             )
             return []
 
-        projects: List[Dict] = self.get_climate_projects()
+        projects: List[Dict] = await self.get_climate_projects()
         if len(projects) == 0:
             return []
 
         # organization_by_id: {org_uid -> org}
-        organization_by_id: Dict[str, Dict] = self.get_climate_organizations()
+        organization_by_id: Dict[str, Dict] = await self.get_climate_organizations()
         if len(organization_by_id) == 0:
             return []
 
+        project_by_id = {project["warehouseProjectId"]: project for project in projects}
+
         # metadata_by_id: {org_uid -> {meta_key -> meta_value}}
         metadata_by_id: Dict[str, Dict[str, str]] = {}
-        for org_uid in organization_by_id.keys():
-            metadata_by_id[org_uid] = self.get_climate_organizations_metadata(org_uid)
-
-        project_by_id = {project["warehouseProjectId"]: project for project in projects}
 
         onchain_units: List[Dict] = []
-        for unit in units:
-            
-            asset_id: str = add_0x_prefix(unit["marketplaceIdentifier"])
-
-            warehouse_project_id: Optional[str] = unit.get("issuance").get(
-                "warehouseProjectId"
+        while len(units) != 0:
+            metadata_by_id |= await self.get_climate_organizations_metadata_by_id(
+                org_uids=[
+                    org_uid
+                    for org_uid in dict.fromkeys(unit.get("orgUid") for unit in units)
+                    if (org_uid in organization_by_id)
+                    and (org_uid not in metadata_by_id)
+                ]
             )
-            org_uid: Optional[str] = unit.get("orgUid")
-            if org_uid is None:
-                logger.warning(
-                    f"Can not get climate warehouse orgUid in unit. unit:{unit}"
-                )
-                continue
 
-            org: Optional[Dict] = organization_by_id.get(org_uid)
-            if org is None:
-                logger.warning(
-                    f"Can not get organization by org_uid. org_uid:{org_uid}"
+            for unit in units:
+                onchain_unit: Optional[Dict] = self._combine_climate_unit(
+                    unit=unit,
+                    organization_by_id=organization_by_id,
+                    project_by_id=project_by_id,
+                    metadata_by_id=metadata_by_id,
                 )
-                continue
+                if onchain_unit is not None:
+                    onchain_units.append(onchain_unit)
 
-            project: Optional[Dict] = project_by_id.get(warehouse_project_id)
-            if project is None:
-                logger.warning(
-                    f"Can not get project by warehouse_project_id. warehouse_project_id:{warehouse_project_id}"
-                )
-                continue
+            units = await anext(unit_pages, [])
 
-            org_metadata: Dict[str, str] = metadata_by_id.get(org_uid)
-           
-            metadata: Dict = json.loads(org_metadata.get(f"meta_{asset_id}", "{}"))
-          
-            unit["organization"] = org
-            unit["token"] = metadata
-            unit["project"] = project
+        return onchain_units
 
-            onchain_units.append(unit)
+    @staticmethod
+    def _combine_climate_unit(
+        unit: Dict,
+        organization_by_id: Dict[str, Dict],
+        project_by_id: Dict[str, Dict],
+        metadata_by_id: Dict[str, Dict[str, str]],
+    ) -> Optional[Dict]:
+        marketplace_identifier: Optional[str] = unit.get("marketplaceIdentifier")
+        if marketplace_identifier is None:
+            return None
+
+        asset_id: str = add_0x_prefix(marketplace_identifier)
+
+        warehouse_project_id: Optional[str] = (unit.get("issuance") or {}).get(
+            "warehouseProjectId"
+        )
+        org_uid: Optional[str] = unit.get("orgUid")
+        if org_uid is None:
+            logger.warning(f"Can not get climate warehouse orgUid in unit. unit:{unit}")
+            return None
+
+        org: Optional[Dict] = organization_by_id.get(org_uid)
+        if org is None:
+            logger.warning(f"Can not get organization by org_uid. org_uid:{org_uid}")
+            return None
+
+        project: Optional[Dict] = project_by_id.get(warehouse_project_id)
+        if project is None:
+            logger.warning(
+                f"Can not get project by warehouse_project_id. warehouse_project_id:{warehouse_project_id}"
+            )
+            return None
 
-        return onchain_units
+        org_metadata: Dict[str, str] = metadata_by_id.get(org_uid)
+
+        metadata: Dict = json.loads(org_metadata.get(f"meta_{asset_id}", "{}"))
+
+        # organizations and projects are shared by their units, not copied
+        return {
+            **{field: unit[field] for field in CLIMATE_UNIT_FIELDS if field in unit},
+            "organization": org,
+            "token": metadata,
+            "project": project,
+        }
 
 
 @dataclasses.dataclass
 class BlockChainCrud(object):
     full_node_client: FullNodeRpcClient
+    # coin records fetched so far, which make up the load of scanned windows
+    num_coin_records: int = 0
 
     async def get_challenge(self) -> str:
         result: Dict = await self.full_node_client.fetch("get_network_info", {})
         return result["network_name"]
 
+    async def get_header_hashes(
+        self,
+        start_height: int,
+        end_height: int,
+    ) -> Dict[int, str]:
+        # `FullNodeRpcClient.get_block_records` hides errors behind an empty list
+        result: Dict = await self.full_node_client.fetch(
+            "get_block_records", {"start": start_height, "end": end_height}
+        )
+        block_records: List[Dict] = result["block_records"] or []
+
+        return {
+            block_record["height"]: add_0x_prefix(block_record["header_hash"])
+            for block_record in block_records
+        }
+
     async def get_activities(
         self,
         org_uid: str,
@@ -190,7 +535,6 @@ class BlockChainCrud(object):
         public_key: G1Element,
         start_height: int,
         end_height: int,
-        peak_height: int,
         mode: Optional[GatewayMode] = None,
     ) -> List[schemas.Activity]:
 
@@ -205,12 +549,121 @@ class BlockChainCrud(object):
             root_public_key=public_key,
             full_node_client=self.full_node_client,
         )
-        activity_objs: List[Dict] = await wallet.get_activities(
+
+        return await self._get_wallet_activities(
+            wallet=wallet,
+            start_height=start_height,
+            end_height=end_height,
             mode=mode,
+        )
+
+    async def get_activities_by_token(
+        self,
+        token: ClimateToken,
+        start_height: int,
+        end_height: int,
+        mode: Optional[GatewayMode] = None,
+    ) -> List[schemas.Activity]:
+        """Like `get_activities`, but reuses the precomputed hashes of `token`."""
+
+        wallet = ClimateObserverWallet.from_token(
+            token=token,
+            full_node_client=self.full_node_client,
+        )
+
+        return await self._get_wallet_activities(
+            wallet=wallet,
             start_height=start_height,
             end_height=end_height,
+            mode=mode,
         )
 
+    async def get_activities_by_tokens(
+        self,
+        tokens: List[ClimateToken],
+        start_height: int,
+        end_height: int,
+        mode: Optional[GatewayMode] = None,
+    ) -> List[List[schemas.Activity]]:
+        """Like `get_activities_by_token`, but queries the coin records of all
+        `tokens` with one `get_coin_records_by_puzzle_hashes` call.
+
+        Activities are returned per token, in the order of `tokens`.
+        """
+
+        wallets: List[ClimateObserverWallet] = [
+            ClimateObserverWallet.from_token(
+                token=token,
+                full_node_client=self.full_node_client,
+            )
+            for token in tokens
+        ]
+        coin_records_by_wallet: List[
+            List[CoinRecord]
+        ] = await ClimateObserverWallet.get_coin_records_by_wallets(
+            full_node_client=self.full_node_client,
+            wallets=wallets,
+            start_height=start_height,
+            end_height=end_height,
+        )
+        self.num_coin_records += sum(
+            len(coin_records) for coin_records in coin_records_by_wallet
+        )
+
+        # the spends of all tokens share one pipeline of `SCAN_SPEND_CONCURRENCY`
+        semaphore = asyncio.Semaphore(settings.SCAN_SPEND_CONCURRENCY)
+        activity_objs_by_wallet: List[List[Dict]] = await asyncio.gather(
+            *[
+                wallet.get_activities_from_coin_records(
+                    coin_records=coin_records,
+                    mode=mode,
+                    semaphore=semaphore,
+                )
+                for (wallet, coin_records) in zip(wallets, coin_records_by_wallet)
+            ]
+        )
+
+        return [
+            self._to_activities(wallet=wallet, activity_objs=activity_objs)
+            for (wallet, activity_objs) in zip(wallets, activity_objs_by_wallet)
+        ]
+
+    async def _get_wallet_activities(
+        self,
+        wallet: ClimateObserverWallet,
+        start_height: int,
+        end_height: int,
+        mode: Optional[GatewayMode] = None,
+    ) -> List[schemas.Activity]:
+
+        coin_records: List[
+            CoinRecord
+        ] = await self.full_node_client.get_coin_records_by_puzzle_hash(
+            puzzle_hash=wallet.gateway_cat_puzzle_hash,
+            start_height=start_height,
+            end_height=end_height,
+        )
+        self.num_coin_records += len(coin_records)
+
+        activity_objs: List[Dict] = await wallet.get_activities_from_coin_records(
+            coin_records=coin_records,
+            mode=mode,
+            max_in_flight=settings.SCAN_SPEND_CONCURRENCY,
+        )
+
+        return self._to_activities(
+            wallet=wallet,
+            activity_objs=activity_objs,
+        )
+
+    def _to_activities(
+        self,
+        wallet: ClimateObserverWallet,
+        activity_objs: List[Dict],
+    ) -> List[schemas.Activity]:
+
+        token_index: ClimateTokenIndex = wallet.token_index
+
         activities: List[schemas.Activity] = []
         for obj in activity_objs:
             coin_record: CoinRecord = obj["coin_record"]
@@ -218,9 +671,6 @@ class BlockChainCrud(object):
             coin: Coin = coin_record.coin
             mode: GatewayMode = obj["mode"]
 
-            if peak_height - coin_record.spent_block_index + 1 < settings.MIN_DEPTH:
-                continue
-
             activity = schemas.Activity(
                 org_uid=token_index.org_uid,
                 warehouse_project_id=token_index.warehouse_project_id,
@@ -1,57 +1,381 @@
 import dataclasses
-from typing import Any, AnyStr, List, Optional
+import datetime
+import hashlib
+import io
+import json
+import re
+from typing import (
+    Any,
+    AnyStr,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
+from blspy import G1Element
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.util.byte_types import hexstr_to_bytes
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import and_, desc, insert, or_, update
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    Table,
+    and_,
+    delete,
+    desc,
+    false,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql.elements import ColumnElement
 
 from app import models, schemas
+from app.config import settings
+from app.core.types import ClimateToken, ClimateTokenIndex, GatewayMode
+from app.core.utils import add_0x_prefix
 from app.db.base import Base
+from app.db.executor import run_in_db_executor
 from app.errors import ErrorCode
 from app.logger import logger
 
 errorcode = ErrorCode()
 
+# the compile-time default of SQLite < 3.32.0, which bounds the rows per statement
+SQLITE_MAX_VARIABLE_NUMBER = 999
+
+ACTIVITY_COLUMNS: Tuple[str, ...] = (
+    "org_uid",
+    "warehouse_project_id",
+    "vintage_year",
+    "sequence_num",
+    "asset_id",
+    "beneficiary_name",
+    "beneficiary_address",
+    "beneficiary_puzzle_hash",
+    "coin_id",
+    "height",
+    "amount",
+    "mode",
+    "metadata",
+    "timestamp",
+)
+
+
+def activity_to_row(activity: schemas.Activity) -> Tuple:
+    """Map an activity to a row in `ACTIVITY_COLUMNS` order.
+
+    Values are encoded the same way `jsonable_encoder` encodes `schemas.Activity`.
+    """
+
+    mode: Any = activity.mode
+    if isinstance(mode, GatewayMode):
+        mode = mode.name
+
+    return (
+        activity.org_uid,
+        activity.warehouse_project_id,
+        activity.vintage_year,
+        activity.sequence_num,
+        f"0x{activity.asset_id.hex()}",
+        activity.beneficiary_name,
+        activity.beneficiary_address,
+        activity.beneficiary_puzzle_hash,
+        f"0x{activity.coin_id.hex()}",
+        activity.height,
+        activity.amount,
+        mode,
+        activity.metadata,
+        activity.timestamp,
+    )
+
+
+def token_to_model(token: ClimateToken) -> Dict[str, Any]:
+    token_index: ClimateTokenIndex = token.token_index
+
+    return {
+        "asset_id": f"0x{token.tail_program_hash.hex()}",
+        "org_uid": token_index.org_uid,
+        "warehouse_project_id": token_index.warehouse_project_id,
+        "vintage_year": token_index.vintage_year,
+        "sequence_num": token_index.sequence_num,
+        "index_hash": f"0x{token_index.name().hex()}",
+        "public_key": f"0x{bytes(token.root_public_key).hex()}",
+        "gateway_cat_puzzle_hash": f"0x{token.gateway_cat_puzzle_hash.hex()}",
+    }
+
+
+def model_to_token(model: models.Token) -> ClimateToken:
+    token_index = ClimateTokenIndex(
+        org_uid=model.org_uid,
+        warehouse_project_id=model.warehouse_project_id,
+        vintage_year=model.vintage_year,
+        sequence_num=model.sequence_num,
+    )
+
+    return ClimateToken(
+        token_index=token_index,
+        root_public_key=G1Element.from_bytes(hexstr_to_bytes(model.public_key)),
+        tail_program_hash=bytes32(hexstr_to_bytes(model.asset_id)),
+        gateway_cat_puzzle_hash=bytes32(hexstr_to_bytes(model.gateway_cat_puzzle_hash)),
+    )
+
+
+def climate_units_to_rows(
+    climate_units: List[Dict],
+) -> Tuple[Dict[str, Dict], Dict[str, Dict], Dict[str, Dict]]:
+    """Split units from `combine_climate_units_and_metadata` into mirror rows.
+
+    Returns the rows of `cw_unit`, `cw_project` and `cw_org`, each by primary key.
+    """
+
+    unit_rows: Dict[str, Dict] = {}
+    project_rows: Dict[str, Dict] = {}
+    org_rows: Dict[str, Dict] = {}
+
+    for climate_unit in climate_units:
+        unit: Dict = climate_unit.copy()
+        token: Dict = unit.pop("token", None)
+        org: Dict = unit.pop("organization")
+        project: Dict = unit.pop("project")
+
+        unit_rows[unit["warehouseUnitId"]] = {
+            "warehouse_unit_id": unit["warehouseUnitId"],
+            "asset_id": add_0x_prefix(unit["marketplaceIdentifier"]),
+            "org_uid": org["orgUid"],
+            "warehouse_project_id": project["warehouseProjectId"],
+            "token": token,
+            "data": unit,
+            "search_text": "\n".join(_json_values(unit)).casefold(),
+        }
+        project_rows[project["warehouseProjectId"]] = {
+            "warehouse_project_id": project["warehouseProjectId"],
+            "org_uid": project.get("orgUid"),
+            "data": project,
+        }
+        org_rows[org["orgUid"]] = {
+            "org_uid": org["orgUid"],
+            "data": org,
+        }
+
+    return (unit_rows, project_rows, org_rows)
+
+
+def _json_values(value: Any) -> Iterator[str]:
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _json_values(item)
+
+    elif isinstance(value, list):
+        for item in value:
+            yield from _json_values(item)
+
+    elif value is not None:
+        yield str(value)
+
+
+def _digest(row: Dict) -> str:
+    return hashlib.sha256(
+        json.dumps(jsonable_encoder(row), sort_keys=True).encode()
+    ).hexdigest()
+
 
 @dataclasses.dataclass
 class DBCrudBase(object):
     db: Session
 
+    @property
+    def dialect_name(self) -> str:
+        return self.db.get_bind().dialect.name
+
+    def insert_ignore(self, table: Table):
+        if self.dialect_name == "postgresql":
+            return postgresql.insert(table).on_conflict_do_nothing()
+
+        return insert(table).prefix_with("OR IGNORE")
+
     def create_object(self, model: Base):
         self.db.add(model)
         self.db.commit()
         self.db.refresh(model)
         return model
 
-    def batch_insert_ignore_db(self, table: AnyStr, models: List[Any]) -> bool:
+    def batch_insert_ignore_db(
+        self, table: AnyStr, models: List[Any], commit: bool = True
+    ) -> bool:
         try:
-            s = (
-                insert(Base.metadata.tables[table])
-                .prefix_with("OR IGNORE")
-                .values(models)
-            )
+            s = self.insert_ignore(Base.metadata.tables[table]).values(models)
             self.db.execute(s)
-            self.db.commit()
+            if commit:
+                self.db.commit()
             return True
         except Exception as e:
             logger.error(f"Batch Insert DB Failure:{e}")
             raise errorcode.internal_server_error(message="Batch Insert DB Failure")
 
-    def insert_db(self, models: Any) -> bool:
+    def _sql_defaults(self, db_table: Table, columns: Sequence[str]) -> Dict[str, str]:
+        # client-side SQL defaults (e.g. `created_at`) are not applied to raw inserts
+        dialect = self.db.get_bind().dialect
+        return {
+            column.name: str(column.default.arg.compile(dialect=dialect))
+            for column in db_table.columns
+            if (column.name not in columns)
+            and (column.default is not None)
+            and column.default.is_clause_element
+        }
+
+    def bulk_insert_ignore_db(
+        self,
+        table: AnyStr,
+        columns: Sequence[str],
+        rows: List[Tuple],
+        commit: bool = True,
+    ) -> bool:
+        """Insert row tuples in `columns` order, skipping conflicting rows.
+
+        Rows bypass ORM objects and SQLAlchemy statement compilation, using `COPY`
+        on PostgreSQL and multi-row `INSERT OR IGNORE` statements on SQLite.
+        """
+
+        if len(rows) == 0:
+            return True
+
+        if self.dialect_name == "postgresql":
+            return self.copy_insert_ignore_db(
+                table=table, columns=columns, rows=rows, commit=commit
+            )
+
+        if self.dialect_name == "sqlite":
+            return self.values_insert_ignore_db(
+                table=table, columns=columns, rows=rows, commit=commit
+            )
+
+        return self.batch_insert_ignore_db(
+            table=table,
+            models=[dict(zip(columns, row)) for row in rows],
+            commit=commit,
+        )
+
+    def values_insert_ignore_db(
+        self,
+        table: AnyStr,
+        columns: Sequence[str],
+        rows: List[Tuple],
+        commit: bool = True,
+    ) -> bool:
+        try:
+            db_table: Table = Base.metadata.tables[table]
+            quote = self.db.get_bind().dialect.identifier_preparer.quote
+            defaults: Dict[str, str] = self._sql_defaults(db_table, columns)
+
+            column_list: str = ", ".join(
+                [quote(column) for column in columns]
+                + [quote(column) for column in defaults.keys()]
+            )
+            row_placeholder: str = (
+                "(" + ", ".join(["?"] * len(columns) + list(defaults.values())) + ")"
+            )
+
+            chunk_size: int = max(1, SQLITE_MAX_VARIABLE_NUMBER // len(columns))
+            connection = self.db.connection()
+            for start in range(0, len(rows), chunk_size):
+                chunk: List[Tuple] = rows[start : start + chunk_size]
+                connection.exec_driver_sql(
+                    f"INSERT OR IGNORE INTO {quote(table)} ({column_list}) "
+                    f"VALUES {', '.join([row_placeholder] * len(chunk))}",
+                    tuple(_to_driver_value(value) for row in chunk for value in row),
+                )
+
+            if commit:
+                self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Batch Insert DB Failure:{e}")
+            raise errorcode.internal_server_error(message="Batch Insert DB Failure")
+
+    def copy_insert_ignore_db(
+        self,
+        table: AnyStr,
+        columns: Sequence[str],
+        rows: List[Tuple],
+        commit: bool = True,
+    ) -> bool:
+        """Bulk insert through PostgreSQL `COPY`, skipping conflicting rows.
+
+        Rows are streamed into a temporary staging table and moved over with a
+        single `INSERT ... SELECT ... ON CONFLICT DO NOTHING`.
+        """
+
+        try:
+            db_table: Table = Base.metadata.tables[table]
+            quote = self.db.get_bind().dialect.identifier_preparer.quote
+            defaults: Dict[str, str] = self._sql_defaults(db_table, columns)
+
+            staging: str = quote(f"{table}_staging")
+            column_list: str = ", ".join(quote(column) for column in columns)
+            insert_column_list: str = ", ".join(
+                [quote(column) for column in columns]
+                + [quote(column) for column in defaults.keys()]
+            )
+            select_list: str = ", ".join(
+                [quote(column) for column in columns] + list(defaults.values())
+            )
+
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write("\t".join(_to_copy_text(value) for value in row))
+                buffer.write("\n")
+            buffer.seek(0)
+
+            cursor = self.db.connection().connection.cursor()
+            try:
+                cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+                cursor.execute(
+                    f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+                    f"SELECT {column_list} FROM {quote(table)} WITH NO DATA"
+                )
+                cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN", buffer)
+                cursor.execute(
+                    f"INSERT INTO {quote(table)} ({insert_column_list}) "
+                    f"SELECT {select_list} FROM {staging} ON CONFLICT DO NOTHING"
+                )
+            finally:
+                cursor.close()
+
+            if commit:
+                self.db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Batch Insert DB Failure:{e}")
+            raise errorcode.internal_server_error(message="Batch Insert DB Failure")
+
+    def insert_db(self, models: Any, commit: bool = True) -> bool:
         try:
             self.db.add(models)
-            self.db.commit()
-            self.db.refresh(models)
+            if commit:
+                self.db.commit()
+                self.db.refresh(models)
             return True
         except Exception as e:
             logger.error(f"Insert DB Failure:{e}")
             raise errorcode.internal_server_error(message="Insert DB Failure")
 
-    def update_db(self, table: Any, stmt: Any) -> bool:
+    def update_db(self, table: Any, stmt: Any, commit: bool = True) -> bool:
         try:
             u = update(Base.metadata.tables[table]).values(stmt)
             self.db.execute(u)
-            self.db.commit()
+            if commit:
+                self.db.commit()
             return True
         except Exception as e:
             logger.error(f"Update DB Failure:{e}")
@@ -64,27 +388,109 @@ class DBCrudBase(object):
             logger.error(f"Select DB Failure:{e}")
             raise errorcode.internal_server_error(message="Select DB Failure")
 
+    def _select_query(self, model: Any, joins: Sequence[Tuple[Any, Any]] = ()):
+        """Query `model`, or a tuple of models inner joined by `(model, onclause)`."""
+
+        if not isinstance(model, (list, tuple)):
+            model = [model]
+
+        query = self.db.query(*model)
+        for (target, onclause) in joins:
+            query = query.join(target, onclause)
+
+        return query
+
     def select_activity_with_pagination(
-        self, model: Any, filters: Any, order_by: Any, limit: int, page: int
+        self,
+        model: Any,
+        filters: Any,
+        order_by: Any,
+        limit: int,
+        page: int,
+        with_total: bool = True,
+        joins: Sequence[Tuple[Any, Any]] = (),
     ):
         try:
-            query = self.db.query(model).filter(
+            if not isinstance(order_by, (list, tuple)):
+                order_by = [order_by]
+
+            query = self._select_query(model, joins=joins).filter(
                 or_(*filters["or"]), and_(*filters["and"])
             )
             return (
                 (
-                    query.order_by(order_by.desc())
+                    query.order_by(*[column.desc() for column in order_by])
                     .limit(limit)
                     .offset((page - 1) * limit)
                     .all()
                 ),
-                query.count(),
+                query.count() if with_total else None,
+            )
+        except Exception as e:
+            logger.error(f"Select DB Failure:{e}")
+            raise errorcode.internal_server_error(message="Select DB Failure")
+
+    def select_activity_with_cursor(
+        self,
+        model: Any,
+        filters: Any,
+        order_by: Sequence[Any],
+        limit: int,
+        cursor: Optional[Tuple] = None,
+        with_total: bool = False,
+        joins: Sequence[Tuple[Any, Any]] = (),
+    ):
+        """Keyset pagination in descending `order_by` order.
+
+        `cursor` holds the `order_by` values of the last row of the previous page,
+        so every page is a bounded index range scan regardless of its depth.
+        """
+
+        try:
+            query = self._select_query(model, joins=joins).filter(
+                or_(*filters["or"]), and_(*filters["and"])
+            )
+
+            page_query = query
+            if cursor is not None:
+                page_query = page_query.filter(tuple_(*order_by) < tuple_(*cursor))
+
+            return (
+                (
+                    page_query.order_by(*[column.desc() for column in order_by])
+                    .limit(limit)
+                    .all()
+                ),
+                query.count() if with_total else None,
             )
         except Exception as e:
             logger.error(f"Select DB Failure:{e}")
             raise errorcode.internal_server_error(message="Select DB Failure")
 
 
+def _to_driver_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+
+    return value
+
+
+def _to_copy_text(value: Any) -> str:
+    if value is None:
+        return "\\N"
+
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
 @dataclasses.dataclass
 class DBCrud(DBCrudBase):
     def create_activity(self, activity: schemas.Activity) -> models.Activity:
@@ -93,22 +499,158 @@ class DBCrud(DBCrudBase):
     def batch_insert_ignore_activity(
         self,
         activities: List[schemas.Activity],
+        commit: bool = True,
     ) -> bool:
 
-        db_activities = []
-        for activity in activities:
-            db_activity = models.Activity(**jsonable_encoder(activity))
-            db_activities.append(jsonable_encoder(db_activity))
-
-        return self.batch_insert_ignore_db(
+        return self.bulk_insert_ignore_db(
             table=models.Activity.__tablename__,
-            models=db_activities,
+            columns=ACTIVITY_COLUMNS,
+            rows=[activity_to_row(activity) for activity in activities],
+            commit=commit,
+        )
+
+    def ingest_activity_window(
+        self,
+        activities: List[schemas.Activity],
+        current_height: Optional[int],
+        asset_ids: Optional[List[str]] = None,
+        header_hashes: Optional[Dict[int, str]] = None,
+        scanned_height: Optional[int] = None,
+        commit: bool = True,
+    ) -> bool:
+        """Insert the activities of a scanned block window and advance
+        `current_height`, and the scanned height of `asset_ids`, past it as a single
+        unit of work.
+
+        `scanned_height` defaults to `current_height`, and windows of tokens that are
+        catching up pass no `current_height` to leave the state alone.
+        `header_hashes` of the scanned heights are recorded to detect reorgs later.
+        """
+
+        if scanned_height is None:
+            scanned_height = current_height
+
+        try:
+            self.batch_insert_ignore_activity(activities, commit=False)
+            if asset_ids is not None:
+                self.update_token_scanned_height(
+                    asset_ids=asset_ids, scanned_height=scanned_height, commit=False
+                )
+            if header_hashes is not None:
+                self.upsert_block_header_hashes(header_hashes, commit=False)
+            if current_height is not None:
+                self.update_block_state(current_height=current_height, commit=False)
+            if commit:
+                self.db.commit()
+            return True
+        except Exception:
+            if commit:
+                self.db.rollback()
+            raise
+
+    def upsert_block_header_hashes(
+        self,
+        header_hashes: Dict[int, str],
+        commit: bool = True,
+    ) -> bool:
+        """Record the header hashes of scanned heights, keeping only the latest
+        `REORG_DEPTH` heights."""
+
+        if len(header_hashes) == 0:
+            return True
+
+        heights: List[int] = list(header_hashes.keys())
+        for index in range(0, len(heights), SQLITE_MAX_VARIABLE_NUMBER):
+            self.db.execute(
+                delete(models.Block).where(
+                    models.Block.height.in_(
+                        heights[index : index + SQLITE_MAX_VARIABLE_NUMBER]
+                    )
+                )
+            )
+        self.batch_insert_ignore_db(
+            table=models.Block.__tablename__,
+            models=[
+                {"height": height, "header_hash": header_hash}
+                for (height, header_hash) in header_hashes.items()
+            ],
+            commit=False,
+        )
+
+        max_height: Optional[int] = self.db.query(
+            func.max(models.Block.height)
+        ).scalar()
+        self.db.execute(
+            delete(models.Block).where(
+                models.Block.height <= max_height - settings.REORG_DEPTH
+            )
+        )
+
+        if commit:
+            self.db.commit()
+        return True
+
+    def select_blocks(self) -> List[models.Block]:
+        return self.db.query(models.Block).order_by(models.Block.height).all()
+
+    def rollback_to_height(self, height: int, commit: bool = True) -> bool:
+        """Drop everything scanned at or above `height`, e.g. the fork point of a
+        reorg, so that it is scanned again."""
+
+        try:
+            self.db.execute(
+                delete(models.Activity).where(models.Activity.height >= height)
+            )
+            self.db.execute(delete(models.Block).where(models.Block.height >= height))
+            self.db.execute(
+                update(models.Token)
+                .where(models.Token.scanned_height > height)
+                .values(scanned_height=height)
+            )
+            self.db.execute(
+                update(models.State)
+                .where(models.State.current_height > height)
+                .values(current_height=height)
+            )
+            if commit:
+                self.db.commit()
+            return True
+        except Exception:
+            if commit:
+                self.db.rollback()
+            raise
+
+    def activity_search_filter(self, search: str) -> ColumnElement:
+        """Full-text filter over beneficiary fields and metadata.
+
+        Every word of `search` has to match the prefix of some indexed token, e.g.
+        `"gre ener"` matches a beneficiary named `"Green Energy"`, and a search
+        without any word matches nothing.
+        """
+
+        if self.dialect_name != "sqlite":
+            return or_(
+                models.Activity.beneficiary_name.ilike(f"%{search}%"),
+                models.Activity.beneficiary_address.ilike(f"%{search}%"),
+                models.Activity.beneficiary_puzzle_hash.ilike(f"%{search}%"),
+            )
+
+        terms: List[str] = re.findall(r"\w+", search)
+        if len(terms) == 0:
+            return false()
+
+        match: str = " ".join(f'"{term}"*' for term in terms)
+        return models.Activity.id.in_(
+            select(literal_column("rowid"))
+            .select_from(table("activity_fts"))
+            .where(text("activity_fts MATCH :match").bindparams(match=match))
         )
 
     def update_block_state(
         self,
         peak_height: Optional[int] = None,
         current_height: Optional[int] = None,
+        commit: bool = True,
     ):
         state = models.State()
         if peak_height is not None:
@@ -120,8 +662,289 @@ class DBCrud(DBCrudBase):
         return self.update_db(
             table=models.State.__tablename__,
             stmt=jsonable_encoder(state),
+            commit=commit,
         )
 
+    def batch_insert_ignore_token(
+        self,
+        tokens: List[ClimateToken],
+        commit: bool = True,
+    ) -> bool:
+
+        if len(tokens) == 0:
+            return True
+
+        return self.batch_insert_ignore_db(
+            table=models.Token.__tablename__,
+            models=[token_to_model(token) for token in tokens],
+            commit=commit,
+        )
+
+    def update_token_scanned_height(
+        self,
+        asset_ids: List[str],
+        scanned_height: int,
+        commit: bool = True,
+    ) -> bool:
+
+        for index in range(0, len(asset_ids), SQLITE_MAX_VARIABLE_NUMBER - 1):
+            self.db.execute(
+                update(models.Token)
+                .where(
+                    models.Token.asset_id.in_(
+                        asset_ids[index : index + SQLITE_MAX_VARIABLE_NUMBER - 1]
+                    )
+                )
+                .values(scanned_height=scanned_height)
+            )
+
+        if commit:
+            self.db.commit()
+        return True
+
+    def select_token_scanned_heights(self) -> Dict[str, Optional[int]]:
+        return {
+            asset_id: scanned_height
+            for (asset_id, scanned_height) in self.db.query(
+                models.Token.asset_id, models.Token.scanned_height
+            )
+        }
+
+    def select_tokens(self, max_token_id: Optional[int] = None) -> List[ClimateToken]:
+        query = self.db.query(models.Token)
+        if max_token_id is not None:
+            query = query.filter(models.Token.id <= max_token_id)
+
+        db_tokens: List[models.Token] = query.order_by(models.Token.id).all()
+        return [model_to_token(db_token) for db_token in db_tokens]
+
+    def select_max_token_id(self) -> Optional[int]:
+        return self.db.query(func.max(models.Token.id)).scalar()
+
+    def create_backfill_shards(
+        self,
+        heights: List[Tuple[int, int]],
+        max_token_id: int,
+        commit: bool = True,
+    ) -> bool:
+
+        self.db.add_all(
+            [
+                models.BackfillShard(
+                    start_height=start_height,
+                    end_height=end_height,
+                    scanned_height=start_height,
+                    max_token_id=max_token_id,
+                )
+                for (start_height, end_height) in heights
+            ]
+        )
+        if commit:
+            self.db.commit()
+        return True
+
+    def select_backfill_shards(self) -> List[models.BackfillShard]:
+        return (
+            self.db.query(models.BackfillShard)
+            .order_by(models.BackfillShard.start_height)
+            .all()
+        )
+
+    def ingest_backfill_window(
+        self,
+        activities: List[schemas.Activity],
+        shard_id: int,
+        scanned_height: int,
+        commit: bool = True,
+    ) -> bool:
+        """Insert the activities of a backfilled block window and checkpoint its
+        shard as a single unit of work."""
+
+        try:
+            self.batch_insert_ignore_activity(activities, commit=False)
+            self.db.execute(
+                update(models.BackfillShard)
+                .where(models.BackfillShard.id == shard_id)
+                .values(scanned_height=scanned_height)
+            )
+            if commit:
+                self.db.commit()
+            return True
+        except Exception:
+            if commit:
+                self.db.rollback()
+            raise
+
+    def finish_backfill(
+        self,
+        joined_height: int,
+        max_token_id: int,
+        commit: bool = True,
+    ) -> bool:
+        """Hand the backfilled tokens over to the scanner at `joined_height`."""
+
+        try:
+            self.db.execute(
+                update(models.Token)
+                .where(models.Token.id <= max_token_id)
+                .where(
+                    or_(
+                        models.Token.scanned_height.is_(None),
+                        models.Token.scanned_height < joined_height,
+                    )
+                )
+                .values(scanned_height=joined_height)
+            )
+            self.db.execute(
+                update(models.State)
+                .where(models.State.current_height < joined_height)
+                .values(current_height=joined_height)
+            )
+            if commit:
+                self.db.commit()
+            return True
+        except Exception:
+            if commit:
+                self.db.rollback()
+            raise
+
+    def acquire_lease(
+        self,
+        name: str,
+        holder: str,
+        seconds: int,
+        commit: bool = True,
+    ) -> bool:
+        """Take or renew the lease `name` for `seconds`, unless another holder has it.
+
+        Returns whether `holder` holds the lease.
+        """
+
+        now: datetime.datetime = datetime.datetime.utcnow()
+
+        self.db.execute(
+            self.insert_ignore(models.Lease.__table__).values(
+                name=name, holder=None, expires_at=now
+            )
+        )
+        result = self.db.execute(
+            update(models.Lease)
+            .where(models.Lease.name == name)
+            .where(
+                or_(
+                    models.Lease.holder == holder,
+                    models.Lease.holder.is_(None),
+                    models.Lease.expires_at < now,
+                )
+            )
+            .values(holder=holder, expires_at=now + datetime.timedelta(seconds=seconds))
+            .execution_options(synchronize_session=False)
+        )
+
+        if commit:
+            self.db.commit()
+        return result.rowcount == 1
+
+    def release_lease(self, name: str, holder: str, commit: bool = True) -> bool:
+        """Give up the lease `name` if `holder` holds it, so that another holder can
+        take it right away instead of waiting for it to expire."""
+
+        result = self.db.execute(
+            update(models.Lease)
+            .where(models.Lease.name == name)
+            .where(models.Lease.holder == holder)
+            .values(holder=None, expires_at=datetime.datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+        if commit:
+            self.db.commit()
+        return result.rowcount == 1
+
+    def sync_climate_warehouse(
+        self,
+        climate_units: List[Dict],
+        commit: bool = True,
+    ) -> Dict[str, int]:
+        """Mirror units from `combine_climate_units_and_metadata` into local tables.
+
+        Only rows whose content changed are written, and rows that are gone from the
+        climate warehouse are deleted. No units at all are taken for a failed fetch,
+        which leaves the mirror alone. Returns the number of written rows by table.
+        """
+
+        if len(climate_units) == 0:
+            return {"cw_unit": 0, "cw_project": 0, "cw_org": 0}
+
+        (unit_rows, project_rows, org_rows) = climate_units_to_rows(climate_units)
+
+        num_rows_by_table: Dict[str, int] = {
+            "cw_unit": self._sync_mirror(
+                models.ClimateWareHouseUnit.warehouse_unit_id, unit_rows
+            ),
+            "cw_project": self._sync_mirror(
+                models.ClimateWareHouseProject.warehouse_project_id, project_rows
+            ),
+            "cw_org": self._sync_mirror(
+                models.ClimateWareHouseOrganization.org_uid, org_rows
+            ),
+        }
+
+        if commit:
+            self.db.commit()
+        return num_rows_by_table
+
+    def _sync_mirror(self, key: Any, rows: Dict[str, Dict]) -> int:
+        model: Any = key.class_
+
+        digest_by_key: Dict[str, str] = dict(self.db.query(key, model.digest).all())
+
+        num_rows: int = 0
+        for (row_key, row) in rows.items():
+            digest: str = _digest(row)
+            if digest_by_key.get(row_key) == digest:
+                continue
+
+            self.db.merge(model(**row, digest=digest))
+            num_rows += 1
+
+        stale_keys: List[str] = [
+            row_key for row_key in digest_by_key.keys() if row_key not in rows
+        ]
+        for index in range(0, len(stale_keys), SQLITE_MAX_VARIABLE_NUMBER):
+            self.db.execute(
+                delete(model).where(
+                    key.in_(stale_keys[index : index + SQLITE_MAX_VARIABLE_NUMBER])
+                )
+            )
+
+        return num_rows + len(stale_keys)
+
+    def climate_warehouse_search_filter(self, search: str) -> ColumnElement:
+        """Case-insensitive substring filter over the values of mirrored units.
+
+        Activities match if any unit of their asset matches, since units split from
+        one another share the asset id.
+        """
+
+        unit = aliased(models.ClimateWareHouseUnit)
+        return models.Activity.asset_id.in_(
+            select(unit.asset_id).where(
+                unit.search_text.contains(search.casefold(), autoescape=True)
+            )
+        )
+
+    def select_climate_warehouse_units(self) -> List[Dict]:
+        """Mirrored units with their token metadata, in the shape of
+        `combine_climate_units_and_metadata` without organizations and projects."""
+
+        return [
+            {**data, "token": token}
+            for (data, token) in self.db.query(
+                models.ClimateWareHouseUnit.data, models.ClimateWareHouseUnit.token
+            ).order_by(models.ClimateWareHouseUnit.warehouse_unit_id)
+        ]
+
     def select_block_state_first(self) -> models.State:
         return self.select_first_db(
             model=models.State,
@@ -133,3 +956,30 @@ class DBCrud(DBCrudBase):
             model=models.Activity,
             order_by=models.Activity.created_at,
         )
+
+
+@dataclasses.dataclass
+class AsyncDBCrud(object):
+    """Awaitable counterpart of `DBCrud`.
+
+    Every `DBCrud` method is exposed under the same name as a coroutine that runs
+    on the database executor, so slow queries do not stall the event loop.
+    """
+
+    db: Session
+
+    def __post_init__(self):
+        self._db_crud = DBCrud(db=self.db)
+
+    def __getattr__(self, name: str) -> Callable:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        method = getattr(self._db_crud, name)
+        if not callable(method):
+            return method
+
+        async def _method(*args, **kwargs):
+            return await run_in_db_executor(method, *args, **kwargs)
+
+        return _method
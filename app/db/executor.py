@@ -0,0 +1,20 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.config import settings
+
+# SQLAlchemy sessions are synchronous, so database work is shipped to these threads
+# to keep it from blocking the event loop
+db_executor = ThreadPoolExecutor(
+    max_workers=settings.DB_EXECUTOR_WORKERS,
+    thread_name_prefix="db",
+)
+
+
+async def run_in_db_executor(func: Callable, *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        db_executor, functools.partial(func, *args, **kwargs)
+    )
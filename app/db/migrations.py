@@ -0,0 +1,119 @@
+import dataclasses
+from typing import List, Optional
+
+from sqlalchemy import engine, insert, select, text, update
+
+from app.logger import logger
+from app.models import SchemaVersion
+
+
+@dataclasses.dataclass(frozen=True)
+class Migration(object):
+    version: int
+    description: str
+    statements: List[str]
+    # dialects the statements apply to, or all dialects if not set
+    dialects: Optional[List[str]] = None
+
+
+# Migrations are applied in order on top of `Base.metadata.create_all`, which only
+# creates missing tables. Statements must be idempotent since fresh databases
+# already get the indexes declared on the models.
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        description="index activity by (height, id) for keyset pagination",
+        statements=[
+            "CREATE INDEX IF NOT EXISTS idx_activity_height_id "
+            "ON activity (height, id)",
+        ],
+    ),
+    Migration(
+        version=2,
+        description="index activity by asset_id and mode for explorer filters",
+        statements=[
+            "CREATE INDEX IF NOT EXISTS idx_activity_asset_id_height_id "
+            "ON activity (asset_id, height, id)",
+            "CREATE INDEX IF NOT EXISTS idx_activity_mode_height_id "
+            "ON activity (mode, height, id)",
+            "ANALYZE activity",
+        ],
+    ),
+    Migration(
+        version=3,
+        description="full-text index over activity beneficiary fields and metadata",
+        statements=[
+            # `rowid` mirrors `activity.id`; hex puzzle hashes are indexed with and
+            # without their `0x` prefix so that both forms prefix-match
+            "CREATE VIRTUAL TABLE IF NOT EXISTS activity_fts USING fts5("
+            "beneficiary_name, beneficiary_address, beneficiary_puzzle_hash, metadata)",
+            "CREATE TRIGGER IF NOT EXISTS activity_fts_insert AFTER INSERT ON activity "
+            "BEGIN "
+            "INSERT INTO activity_fts (rowid, beneficiary_name, beneficiary_address, "
+            "beneficiary_puzzle_hash, metadata) VALUES (new.id, new.beneficiary_name, "
+            "new.beneficiary_address, new.beneficiary_puzzle_hash || ' ' || "
+            "substr(new.beneficiary_puzzle_hash, 3), new.metadata); "
+            "END",
+            "CREATE TRIGGER IF NOT EXISTS activity_fts_delete AFTER DELETE ON activity "
+            "BEGIN "
+            "DELETE FROM activity_fts WHERE rowid = old.id; "
+            "END",
+            "CREATE TRIGGER IF NOT EXISTS activity_fts_update AFTER UPDATE ON activity "
+            "BEGIN "
+            "DELETE FROM activity_fts WHERE rowid = old.id; "
+            "INSERT INTO activity_fts (rowid, beneficiary_name, beneficiary_address, "
+            "beneficiary_puzzle_hash, metadata) VALUES (new.id, new.beneficiary_name, "
+            "new.beneficiary_address, new.beneficiary_puzzle_hash || ' ' || "
+            "substr(new.beneficiary_puzzle_hash, 3), new.metadata); "
+            "END",
+            "DELETE FROM activity_fts",
+            "INSERT INTO activity_fts (rowid, beneficiary_name, beneficiary_address, "
+            "beneficiary_puzzle_hash, metadata) SELECT id, beneficiary_name, "
+            "beneficiary_address, beneficiary_puzzle_hash || ' ' || "
+            "substr(beneficiary_puzzle_hash, 3), metadata FROM activity",
+        ],
+        dialects=["sqlite"],
+    ),
+]
+
+
+def get_schema_version(connection: engine.Connection) -> Optional[int]:
+    return connection.execute(
+        select(SchemaVersion.version).where(SchemaVersion.id == 1)
+    ).scalar()
+
+
+def run_migrations(
+    Engine: engine.Engine,
+    migrations: List[Migration] = MIGRATIONS,
+) -> int:
+    SchemaVersion.__table__.create(Engine, checkfirst=True)
+
+    with Engine.begin() as connection:
+        version: Optional[int] = get_schema_version(connection)
+        if version is None:
+            version = 0
+            connection.execute(insert(SchemaVersion).values(id=1, version=version))
+
+        for migration in sorted(migrations, key=lambda m: m.version):
+            if migration.version <= version:
+                continue
+
+            logger.info(
+                f"Migrate database to version {migration.version}: {migration.description}"
+            )
+            if (migration.dialects is None) or (
+                Engine.dialect.name in migration.dialects
+            ):
+                for statement in migration.statements:
+                    connection.execute(text(statement))
+
+            version = migration.version
+            connection.execute(
+                update(SchemaVersion)
+                .where(SchemaVersion.id == 1)
+                .values(version=version)
+            )
+
+    logger.info(f"Database schema version: {version}")
+    return version
@@ -1,31 +1,97 @@
-from typing import Type
+import asyncio
+from typing import Dict, Optional, Type
 
-from sqlalchemy import create_engine, engine
+from sqlalchemy import create_engine, engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from app import crud
 from app.api import dependencies as deps
 from app.config import settings
 from app.utils import as_async_contextmanager
 
+# the network challenge never changes during the lifetime of a process, so it is
+# resolved once and the engine/session factory built for it are shared
+_challenge: Optional[str] = None
+_challenge_lock = asyncio.Lock()
+_engine_by_challenge: Dict[str, engine.Engine] = {}
+_session_local_by_challenge: Dict[str, Type[Session]] = {}
 
-async def get_engine_cls() -> Type[engine.Engine]:
-    async with as_async_contextmanager(
-        deps.get_full_node_rpc_client
-    ) as full_node_client:
-        blockchain_crud = crud.BlockChainCrud(full_node_client)
-        challenge: str = await blockchain_crud.get_challenge()
 
-    db_url: str = "sqlite:///" + str(settings.DB_PATH).replace("CHALLENGE", challenge)
+async def get_challenge() -> str:
+    global _challenge
+
+    if _challenge is not None:
+        return _challenge
+
+    async with _challenge_lock:
+        if _challenge is None:
+            async with as_async_contextmanager(
+                deps.get_full_node_rpc_client
+            ) as full_node_client:
+                blockchain_crud = crud.BlockChainCrud(full_node_client)
+                _challenge = await blockchain_crud.get_challenge()
+
+    return _challenge
+
+
+def get_db_url(challenge: str) -> str:
+    if settings.DB_URL is not None:
+        return settings.DB_URL.replace("CHALLENGE", challenge)
+
+    return "sqlite:///" + str(settings.DB_PATH).replace("CHALLENGE", challenge)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.DB_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.DB_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.DB_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={settings.DB_CACHE_SIZE}")
+    cursor.close()
+
+
+def create_engine_for_challenge(challenge: str) -> engine.Engine:
+    db_url: engine.URL = make_url(get_db_url(challenge))
+    is_sqlite: bool = db_url.get_backend_name() == "sqlite"
+
+    connect_args: Dict = {}
+    if is_sqlite:
+        connect_args = {"check_same_thread": False, "timeout": 15}
+
     Engine = create_engine(
-        db_url, connect_args={"check_same_thread": False, "timeout": 15}
+        db_url,
+        connect_args=connect_args,
+        poolclass=QueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
     )
+    if is_sqlite:
+        event.listen(Engine, "connect", set_sqlite_pragmas)
+
+    return Engine
+
+
+async def get_engine_cls() -> Type[engine.Engine]:
+    challenge: str = await get_challenge()
+
+    Engine: Optional[engine.Engine] = _engine_by_challenge.get(challenge)
+    if Engine is None:
+        Engine = create_engine_for_challenge(challenge)
+        _engine_by_challenge[challenge] = Engine
 
     return Engine
 
 
 async def get_session_local_cls() -> Type[Session]:
-    Engine = await get_engine_cls()
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=Engine)
+    challenge: str = await get_challenge()
+
+    SessionLocal: Optional[Type[Session]] = _session_local_by_challenge.get(challenge)
+    if SessionLocal is None:
+        Engine = await get_engine_cls()
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=Engine)
+        _session_local_by_challenge[challenge] = SessionLocal
 
     return SessionLocal
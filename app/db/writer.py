@@ -0,0 +1,112 @@
+import asyncio
+import dataclasses
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.api import dependencies as deps
+from app.config import settings
+from app.db.executor import run_in_db_executor
+from app.logger import logger
+from app.utils import as_async_contextmanager
+
+
+@dataclasses.dataclass
+class WriteJob(object):
+    func: Callable[..., Any]
+    args: Tuple
+    kwargs: dict
+    future: asyncio.Future
+
+    def __call__(self, db_crud: crud.DBCrud) -> Any:
+        return self.func(db_crud, *self.args, commit=False, **self.kwargs)
+
+
+@dataclasses.dataclass
+class DBWriter(object):
+    """Single writer for the scanner.
+
+    Write jobs are `DBCrud` methods (e.g. `crud.DBCrud.update_block_state`) that get
+    called with `commit=False` on the writer's own session. Jobs queued while a batch
+    is running are grouped into the next batch and committed together, so concurrent
+    scanner writes never contend for the SQLite write lock and share one fsync.
+    """
+
+    max_batch_size: int = settings.DB_WRITER_BATCH_SIZE
+
+    _queue: Optional[asyncio.Queue] = dataclasses.field(default=None, init=False)
+    _task: Optional[asyncio.Task] = dataclasses.field(default=None, init=False)
+
+    async def submit(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._queue.put(
+            WriteJob(func=func, args=args, kwargs=kwargs, future=future)
+        )
+        return await future
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            jobs: List[WriteJob] = [await self._queue.get()]
+            while len(jobs) < self.max_batch_size and not self._queue.empty():
+                jobs.append(self._queue.get_nowait())
+
+            try:
+                async with as_async_contextmanager(deps.get_db_session) as db:
+                    await run_in_db_executor(self._execute, db, jobs)
+            except Exception as e:
+                logger.error(f"DB writer failure, ErrorMessage: {e}")
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+
+    def _execute(self, db: Session, jobs: List[WriteJob]) -> None:
+        db_crud = crud.DBCrud(db=db)
+
+        try:
+            results: List[Any] = [job(db_crud) for job in jobs]
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            if len(jobs) == 1:
+                _resolve_job(jobs[0], exception=e)
+                return
+
+            # isolate the failing job so that the rest of the batch still lands
+            for job in jobs:
+                self._execute(db, [job])
+
+            return
+
+        for (job, result) in zip(jobs, results):
+            _resolve_job(job, result=result)
+
+
+def _resolve_job(
+    job: WriteJob,
+    result: Any = None,
+    exception: Optional[BaseException] = None,
+) -> None:
+    def _resolve() -> None:
+        if job.future.done():
+            return
+
+        if exception is not None:
+            job.future.set_exception(exception)
+        else:
+            job.future.set_result(result)
+
+    job.future.get_loop().call_soon_threadsafe(_resolve)
+
+
+db_writer = DBWriter()
@@ -3,9 +3,12 @@ import traceback
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi_utils.tasks import repeat_every
 from starlette.requests import Request
 from starlette.responses import Response
 
+from app import crud
+from app.api import dependencies as deps
 from app.api import v1
 from app.config import ExecutionMode, settings
 from app.logger import log_config, logger
@@ -25,6 +28,23 @@ if settings.MODE == ExecutionMode.DEV:
 
 app.include_router(v1.router)
 
+
+@app.on_event("startup")
+@repeat_every(seconds=settings.RPC_HEALTH_CHECK_INTERVAL, logger=logger)
+async def check_rpc_clients_health() -> None:
+    await deps.check_rpc_clients_health()
+
+
+@app.on_event("shutdown")
+async def close_rpc_clients() -> None:
+    await deps.close_rpc_clients()
+
+
+@app.on_event("shutdown")
+async def close_climate_warehouse_session() -> None:
+    await crud.close_climate_warehouse_session()
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -1,2 +1,10 @@
 from app.models.activity import Activity  # noqa
+from app.models.backfill_shard import BackfillShard  # noqa
+from app.models.block import Block  # noqa
+from app.models.cw_org import ClimateWareHouseOrganization  # noqa
+from app.models.cw_project import ClimateWareHouseProject  # noqa
+from app.models.cw_unit import ClimateWareHouseUnit  # noqa
+from app.models.lease import Lease  # noqa
+from app.models.schema_version import SchemaVersion  # noqa
 from app.models.state import State  # noqa
+from app.models.token import Token  # noqa
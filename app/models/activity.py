@@ -3,6 +3,7 @@ from sqlalchemy import (
     BigInteger,
     Column,
     DateTime,
+    Index,
     Integer,
     String,
     UniqueConstraint,
@@ -41,4 +42,7 @@ class Activity(Base):
             "coin_id",
             name="uk_coin_id",
         ),
+        Index("idx_activity_height_id", "height", "id"),
+        Index("idx_activity_asset_id_height_id", "asset_id", "height", "id"),
+        Index("idx_activity_mode_height_id", "mode", "height", "id"),
     )
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, func
+
+from app.db.base import Base
+
+
+class BackfillShard(Base):
+    __tablename__ = "backfill_shard"
+
+    id = Column(Integer, primary_key=True, index=True)
+    start_height = Column(BigInteger)
+    end_height = Column(BigInteger)
+    # blocks of the shard below this height have been scanned
+    scanned_height = Column(BigInteger)
+    # the shard covers the tokens registered up to this id
+    max_token_id = Column(Integer)
+
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=datetime.now)
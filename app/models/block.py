@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, Column, DateTime, String, func
+
+from app.db.base import Base
+
+
+class Block(Base):
+    __tablename__ = "block"
+
+    height = Column(BigInteger, primary_key=True)
+    header_hash = Column(String)
+
+    created_at = Column(DateTime, default=func.now())
@@ -0,0 +1,14 @@
+from sqlalchemy import JSON, Column, DateTime, String, func
+
+from app.db.base import Base
+
+
+class ClimateWareHouseOrganization(Base):
+    __tablename__ = "cw_org"
+
+    org_uid = Column(String, primary_key=True)
+
+    data = Column(JSON)
+    digest = Column(String)
+
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -0,0 +1,15 @@
+from sqlalchemy import JSON, Column, DateTime, String, func
+
+from app.db.base import Base
+
+
+class ClimateWareHouseProject(Base):
+    __tablename__ = "cw_project"
+
+    warehouse_project_id = Column(String, primary_key=True)
+
+    org_uid = Column(String)
+    data = Column(JSON)
+    digest = Column(String)
+
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -0,0 +1,24 @@
+from sqlalchemy import JSON, Column, DateTime, Index, String, Text, func
+
+from app.db.base import Base
+
+
+class ClimateWareHouseUnit(Base):
+    __tablename__ = "cw_unit"
+
+    warehouse_unit_id = Column(String, primary_key=True)
+
+    asset_id = Column(String)
+    org_uid = Column(String)
+    warehouse_project_id = Column(String)
+    # the token metadata kept in the organization metadata
+    token = Column(JSON)
+    data = Column(JSON)
+    # casefolded values of `data` without its keys, for case-insensitive search
+    search_text = Column(Text)
+    # hash of the mirrored row, so that unchanged rows are not rewritten
+    digest = Column(String)
+
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (Index("idx_cw_unit_asset_id", "asset_id"),)
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, DateTime, String
+
+from app.db.base import Base
+
+
+class Lease(Base):
+    __tablename__ = "lease"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String)
+    expires_at = Column(DateTime)
@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, func
+
+from app.db.base import Base
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True, index=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=datetime.now)
@@ -0,0 +1,38 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Integer,
+    String,
+    UniqueConstraint,
+    func,
+)
+
+from app.db.base import Base
+
+
+class Token(Base):
+    __tablename__ = "token"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # the tail program hash
+    asset_id = Column(String)
+    org_uid = Column(String)
+    warehouse_project_id = Column(String)
+    vintage_year = Column(Integer)
+    sequence_num = Column(Integer)
+    index_hash = Column(String)
+    public_key = Column(String)
+    gateway_cat_puzzle_hash = Column(String)
+    # blocks below this height have been scanned, or `BLOCK_START` if not set
+    scanned_height = Column(BigInteger)
+
+    created_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint(
+            "asset_id",
+            name="uk_asset_id",
+        ),
+    )
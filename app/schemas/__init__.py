@@ -18,7 +18,7 @@ from app.schemas.payment import (  # noqa
     PaymentWithPayer,
     RetirementPaymentWithPayer,
 )
-from app.schemas.state import State  # noqa
+from app.schemas.state import ClimateWareHouseCacheState, ScannerState, State  # noqa
 from app.schemas.token import (  # noqa
     DetokenizationFileParseResponse,
     DetokenizationFileRequest,
@@ -52,4 +52,5 @@ class ActivityWithCW(ActivityBase):
 
 class ActivitiesResponse(BaseModel):
     activities: List[ActivityWithCW] = Field(default_factory=list)
-    total: int = 0
+    total: Optional[int] = 0
+    next_cursor: Optional[str] = None
@@ -7,3 +7,18 @@ class State(BaseModel):
     id: Optional[int] = None
     current_height: Optional[int] = None
     block_height: Optional[int] = None
+
+
+class ScannerState(BaseModel):
+    block_range: int
+    blocks_per_second: Optional[float] = None
+    coin_records_per_second: Optional[float] = None
+    last_window_seconds: Optional[float] = None
+
+
+class ClimateWareHouseCacheState(BaseModel):
+    entries: int
+    hits: int
+    stale_hits: int
+    misses: int
+    revalidations: int
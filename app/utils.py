@@ -1,9 +1,10 @@
+import base64
 import functools
 import inspect
 import os
 import time
 from contextlib import asynccontextmanager, contextmanager
-from typing import Callable, List
+from typing import Callable, List, Tuple
 
 from fastapi import status
 from fastapi.concurrency import contextmanager_in_threadpool
@@ -46,3 +47,13 @@ def wait_until_dir_exists(path: str, interval: int = 1) -> None:
 
         logger.warning(f"Path {path} does not exist, sleeping for {interval} seconds")
         time.sleep(interval)
+
+
+def encode_cursor(values: Tuple[int, ...]) -> str:
+    raw: str = ":".join(str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[int, ...]:
+    raw: str = base64.urlsafe_b64decode(cursor.encode()).decode()
+    return tuple(int(value) for value in raw.split(":"))
@@ -0,0 +1,102 @@
+"""Micro-benchmark for `DBCrud.batch_insert_ignore_activity`.
+
+Compares the former ORM/`jsonable_encoder` path against the columnar row path on a
+fresh SQLite file, e.g.
+
+    MODE=dev python -m benchmarks.activity_insert --rows 20000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import models, schemas
+from app.crud.db import DBCrud
+from app.db.base import Base
+
+
+def make_activities(rows: int) -> List[schemas.Activity]:
+    return [
+        schemas.Activity(
+            org_uid="cf7af8da584b6c115ba8247c5cdd05506c3b3c5c632ed975cc2b16262493e2bd",
+            warehouse_project_id="c9b98579-debb-49f3-b417-0adbae4ed5c7",
+            vintage_year=2096,
+            sequence_num=0,
+            asset_id="0x438f0630bebb927cbef0663b6b4bfb1820a754975e25a8ef20fb10b6c616c4de",
+            beneficiary_name=f"beneficiary {index}",
+            beneficiary_address="bls12381uy38v0kyqaknlg6kl0lchd3ar7wh3dfv83th5qg5pn29t8hr99nq2vsjek",
+            beneficiary_puzzle_hash="0xe122763ec4076d3fa356fbff8bb63d1f9d78b52c3c577a01140cd4559ee32966",
+            coin_id=index.to_bytes(32, "big"),
+            height=1_720_476 + index,
+            amount=10_000,
+            mode="PERMISSIONLESS_RETIREMENT",
+            metadata={"bn": f"beneficiary {index}"},
+            timestamp=1_666_843_885,
+        )
+        for index in range(rows)
+    ]
+
+
+def insert_with_orm(db_crud: DBCrud, activities: List[schemas.Activity]) -> None:
+    db_activities = []
+    for activity in activities:
+        db_activity = models.Activity(**jsonable_encoder(activity))
+        db_activities.append(jsonable_encoder(db_activity))
+
+    db_crud.batch_insert_ignore_db(
+        table=models.Activity.__tablename__, models=db_activities
+    )
+
+
+def insert_with_rows(db_crud: DBCrud, activities: List[schemas.Activity]) -> None:
+    db_crud.batch_insert_ignore_activity(activities)
+
+
+def measure(
+    name: str,
+    insert: Callable[[DBCrud, List[schemas.Activity]], None],
+    activities: List[schemas.Activity],
+    batch_size: int,
+) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        Engine = create_engine(f"sqlite:///{Path(directory) / 'activity.sqlite'}")
+        Base.metadata.create_all(Engine)
+
+        db: Session = sessionmaker(bind=Engine)()
+        db_crud = DBCrud(db=db)
+
+        start = time.perf_counter()
+        for index in range(0, len(activities), batch_size):
+            insert(db_crud, activities[index : index + batch_size])
+        elapsed = time.perf_counter() - start
+
+        assert db.query(models.Activity).count() == len(activities)
+        db.close()
+        Engine.dispose()
+
+    rows_per_second: float = len(activities) / elapsed
+    print(f"{name:>6}: {rows_per_second:>12,.0f} rows/s ({elapsed:.3f}s)")
+    return rows_per_second
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    activities = make_activities(args.rows)
+
+    before = measure("orm", insert_with_orm, activities, args.batch_size)
+    after = measure("rows", insert_with_rows, activities, args.batch_size)
+    print(f"speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
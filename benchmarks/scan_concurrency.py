@@ -0,0 +1,170 @@
+"""Benchmark for the per-token concurrency of `_scan_token_activity`.
+
+Scans one block window over fake CADT units and a fake full node whose RPCs take a
+fixed latency, and reports blocks/s for increasing `SCAN_CONCURRENCY`, e.g.
+
+    MODE=dev python -m benchmarks.scan_concurrency --tokens 200 --latency 0.05
+
+Every token has `--spends` spent gateway coins in the window, whose spends are
+fetched but not parsed, so that only RPC latency is measured.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import time
+from typing import Dict, List, Optional
+
+from blspy import G1Element
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.coin_record import CoinRecord
+from chia.util.ints import uint32, uint64
+
+from app import crud, models
+from app.api.v1 import cron
+from app.config import settings
+from app.core.climate_wallet.wallet import ClimateObserverWallet
+from app.core.types import ClimateToken
+
+
+@dataclasses.dataclass
+class FakeDBCrud(object):
+    peak_height: int
+
+    async def select_block_state_first(self) -> models.State:
+        return models.State(id=1, current_height=0, peak_height=self.peak_height)
+
+    async def select_climate_warehouse_units(self) -> List[Dict]:
+        # tokens are discovered from the climate warehouse, as before the first sync
+        return []
+
+    async def select_tokens(self) -> List[ClimateToken]:
+        return []
+
+    async def select_token_scanned_heights(self) -> Dict[str, Optional[int]]:
+        return {}
+
+    async def select_blocks(self) -> List[models.Block]:
+        return []
+
+
+@dataclasses.dataclass
+class FakeClimateWareHouseCrud(object):
+    tokens: int
+
+    async def combine_climate_units_and_metadata(self, search: Dict) -> List[Dict]:
+        public_key: str = bytes(G1Element.generator()).hex()
+        return [
+            {
+                "marketplaceIdentifier": f"{index:064x}",
+                "token": {
+                    "org_uid": "ORG_UID",
+                    "warehouse_project_id": "WAREHOUSE_PROJECT_ID",
+                    "vintage_year": 2050,
+                    "sequence_num": index,
+                    "public_key": public_key,
+                },
+            }
+            for index in range(self.tokens)
+        ]
+
+
+@dataclasses.dataclass
+class FakeFullNodeClient(object):
+    latency: float
+    spends: int
+
+    def _coin_records(self, puzzle_hashes: List[bytes32]) -> List[CoinRecord]:
+        return [
+            CoinRecord(
+                coin=Coin(bytes32(b"\x00" * 32), puzzle_hash, uint64(index)),
+                confirmed_block_index=uint32(settings.BLOCK_START),
+                spent_block_index=uint32(settings.BLOCK_START),
+                coinbase=False,
+                timestamp=uint64(0),
+            )
+            for puzzle_hash in puzzle_hashes
+            for index in range(self.spends)
+        ]
+
+    async def fetch(self, path: str, request: Dict) -> Dict:
+        await asyncio.sleep(self.latency)
+        return {"block_records": []}
+
+    async def get_coin_records_by_puzzle_hash(
+        self, puzzle_hash: bytes32, **kwargs
+    ) -> List[CoinRecord]:
+        await asyncio.sleep(self.latency)
+        return self._coin_records([puzzle_hash])
+
+    async def get_coin_records_by_puzzle_hashes(
+        self, puzzle_hashes: List[bytes32], **kwargs
+    ) -> List[CoinRecord]:
+        await asyncio.sleep(self.latency)
+        return self._coin_records(puzzle_hashes)
+
+    async def get_puzzle_and_solution(self, **kwargs) -> None:
+        await asyncio.sleep(self.latency)
+        return None
+
+
+async def noop_submit(*args, **kwargs) -> bool:
+    return True
+
+
+async def measure(concurrency: int, tokens: int, latency: float, spends: int) -> float:
+    settings.SCAN_CONCURRENCY = concurrency
+    cron.scan_window = cron.ScanWindow()
+
+    start = time.perf_counter()
+    await cron._scan_token_activity(
+        db_crud=FakeDBCrud(peak_height=settings.BLOCK_START + settings.BLOCK_RANGE * 2),
+        climate_warehouse=FakeClimateWareHouseCrud(tokens=tokens),
+        blockchain=crud.BlockChainCrud(
+            full_node_client=FakeFullNodeClient(latency=latency, spends=spends)
+        ),
+    )
+    elapsed = time.perf_counter() - start
+
+    blocks_per_second: float = cron.scan_window.blocks_per_second
+    print(
+        f"SCAN_CONCURRENCY={concurrency:>3}: {blocks_per_second:>12,.0f} blocks/s ({elapsed:.3f}s)"
+    )
+    return blocks_per_second
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32]
+    )
+    parser.add_argument("--spends", type=int, default=1)
+    parser.add_argument("--by-puzzle-hashes", action="store_true")
+    args = parser.parse_args()
+
+    # spends are fetched but not parsed
+    ClimateObserverWallet._parse_activity = lambda self, **kwargs: None
+
+    settings.SCAN_BY_PUZZLE_HASHES = args.by_puzzle_hashes
+
+    cron.db_writer.submit = noop_submit
+
+    # register the tokens up front so that puzzle hashing is not measured
+    await cron.get_tokens(
+        db_crud=FakeDBCrud(peak_height=0),
+        climate_units=await FakeClimateWareHouseCrud(
+            tokens=args.tokens
+        ).combine_climate_units_and_metadata(search={}),
+    )
+
+    for concurrency in args.concurrency:
+        await measure(
+            concurrency, tokens=args.tokens, latency=args.latency, spends=args.spends
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from app import backfill, models
+
+
+class TestSplitShards:
+    def test_with_partial_last_shard_then_success(self):
+        actual = backfill.split_shards(100, 350, 100)
+        assert actual == [(100, 200), (200, 300), (300, 350)]
+
+
+class TestBackfillShard:
+    @pytest.mark.asyncio
+    async def test_resume_from_checkpoint_then_success(self, monkeypatch):
+        shard = models.BackfillShard(
+            id=1, start_height=100, end_height=350, scanned_height=200
+        )
+
+        mock_scan_tokens = mock.AsyncMock(return_value=[])
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(backfill.cron, "scan_tokens", mock_scan_tokens)
+        monkeypatch.setattr(backfill.db_writer, "submit", mock_submit)
+
+        await backfill.backfill_shard(
+            shard=shard,
+            blockchain=mock.MagicMock(),
+            tokens=[],
+            window_size=100,
+        )
+
+        assert [
+            (call.kwargs["start_height"], call.kwargs["end_height"])
+            for call in mock_scan_tokens.call_args_list
+        ] == [(200, 300), (300, 350)]
+        assert [
+            call.kwargs["scanned_height"] for call in mock_submit.call_args_list
+        ] == [300, 350]
+
+
+class TestBackfill:
+    @pytest.mark.asyncio
+    async def test_scanner_lease_held_then_refused(self, monkeypatch):
+        mock_backfill = mock.AsyncMock(return_value=100)
+
+        monkeypatch.setattr(backfill.cron, "init_db", mock.AsyncMock())
+        monkeypatch.setattr(
+            backfill.cron, "acquire_scanner_lease", mock.AsyncMock(return_value=False)
+        )
+        monkeypatch.setattr(backfill, "_backfill", mock_backfill)
+
+        with pytest.raises(ValueError):
+            await backfill.backfill(workers=1, shard_size=100, window_size=10)
+
+        mock_backfill.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_scanner_lease_lost_then_backfill_cancelled(self, monkeypatch):
+        cancelled = asyncio.Event()
+
+        async def mock_backfill(**kwargs):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        monkeypatch.setattr(backfill.cron, "init_db", mock.AsyncMock())
+        monkeypatch.setattr(
+            backfill.cron,
+            "acquire_scanner_lease",
+            mock.AsyncMock(side_effect=[True, False]),
+        )
+        monkeypatch.setattr(backfill.cron, "release_scanner_lease", mock.AsyncMock())
+        monkeypatch.setattr(backfill.settings, "SCANNER_LEASE_SECONDS", 0)
+        monkeypatch.setattr(backfill, "_backfill", mock_backfill)
+
+        with pytest.raises(RuntimeError):
+            await backfill.backfill(workers=1, shard_size=100, window_size=10)
+
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_scanner_lease_held_then_released_after_backfill(self, monkeypatch):
+        mock_release = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(backfill.cron, "init_db", mock.AsyncMock())
+        monkeypatch.setattr(
+            backfill.cron, "acquire_scanner_lease", mock.AsyncMock(return_value=True)
+        )
+        monkeypatch.setattr(backfill.cron, "release_scanner_lease", mock_release)
+        monkeypatch.setattr(backfill, "_backfill", mock.AsyncMock(return_value=100))
+
+        actual = await backfill.backfill(workers=1, shard_size=100, window_size=10)
+
+        assert actual == 100
+        mock_release.assert_awaited_once()
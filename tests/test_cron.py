@@ -0,0 +1,642 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from blspy import G1Element
+from chia.types.blockchain_format.sized_bytes import bytes32
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.api.v1 import cron
+from app.core.types import ClimateToken, ClimateTokenIndex
+from app.crud.db import DBCrud
+from app.db.base import Base
+
+
+def make_units(count: int):
+    public_key: str = bytes(G1Element.generator()).hex()
+    return [
+        {
+            "marketplaceIdentifier": f"{index:064x}",
+            "token": {
+                "org_uid": "ORG_UID",
+                "warehouse_project_id": "WAREHOUSE_PROJECT_ID",
+                "vintage_year": 2050,
+                "sequence_num": index,
+                "public_key": public_key,
+            },
+        }
+        for index in range(count)
+    ]
+
+
+class TestScanTokenActivity:
+    @pytest.mark.asyncio
+    async def test_concurrent_scans_keep_unit_order_then_success(self, monkeypatch):
+        units = make_units(5)
+
+        async def mock_get_activities_by_token(token, **kwargs):
+            sequence_num = token.token_index.sequence_num
+
+            # later units finish first
+            await asyncio.sleep(0.01 * (5 - sequence_num))
+            return [sequence_num]
+
+        mock_db_crud = mock.MagicMock()
+        mock_db_crud.select_block_state_first = mock.AsyncMock(
+            return_value=models.State(id=1, current_height=0, peak_height=100_000)
+        )
+        mock_db_crud.select_climate_warehouse_units = mock.AsyncMock(return_value=[])
+        mock_db_crud.select_tokens = mock.AsyncMock(return_value=[])
+        mock_db_crud.select_token_scanned_heights = mock.AsyncMock(return_value={})
+        mock_db_crud.select_blocks = mock.AsyncMock(return_value=[])
+        mock_climate_warehouse = mock.MagicMock()
+        mock_climate_warehouse.combine_climate_units_and_metadata = mock.AsyncMock(
+            return_value=units
+        )
+        mock_blockchain = mock.MagicMock()
+        mock_blockchain.num_coin_records = 0
+        mock_blockchain.get_header_hashes = mock.AsyncMock(return_value={})
+        mock_blockchain.get_activities_by_token = mock_get_activities_by_token
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.settings, "SCAN_CONCURRENCY", 3)
+        monkeypatch.setattr(cron.settings, "SCAN_BY_PUZZLE_HASHES", False)
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron, "_token_by_asset_id", {})
+        monkeypatch.setattr(cron.settings, "BLOCK_START", 0)
+        monkeypatch.setattr(cron, "scan_window", cron.ScanWindow())
+
+        actual = await cron._scan_token_activity(
+            db_crud=mock_db_crud,
+            climate_warehouse=mock_climate_warehouse,
+            blockchain=mock_blockchain,
+        )
+
+        assert actual is True
+        assert mock_submit.call_args.kwargs["activities"] == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_batched_puzzle_hash_scans_keep_unit_order_then_success(
+        self, monkeypatch
+    ):
+        units = make_units(5)
+
+        async def mock_get_activities_by_tokens(tokens, **kwargs):
+            # later batches finish first
+            await asyncio.sleep(0.01 * (5 - tokens[0].token_index.sequence_num))
+            return [[token.token_index.sequence_num] for token in tokens]
+
+        mock_db_crud = mock.MagicMock()
+        mock_db_crud.select_block_state_first = mock.AsyncMock(
+            return_value=models.State(id=1, current_height=0, peak_height=100_000)
+        )
+        mock_db_crud.select_climate_warehouse_units = mock.AsyncMock(return_value=[])
+        mock_db_crud.select_tokens = mock.AsyncMock(return_value=[])
+        mock_db_crud.select_token_scanned_heights = mock.AsyncMock(return_value={})
+        mock_db_crud.select_blocks = mock.AsyncMock(return_value=[])
+        mock_climate_warehouse = mock.MagicMock()
+        mock_climate_warehouse.combine_climate_units_and_metadata = mock.AsyncMock(
+            return_value=units
+        )
+        mock_blockchain = mock.MagicMock()
+        mock_blockchain.num_coin_records = 0
+        mock_blockchain.get_header_hashes = mock.AsyncMock(return_value={})
+        mock_blockchain.get_activities_by_tokens = mock.AsyncMock(
+            side_effect=mock_get_activities_by_tokens
+        )
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.settings, "SCAN_BY_PUZZLE_HASHES", True)
+        monkeypatch.setattr(cron.settings, "SCAN_PUZZLE_HASH_BATCH_SIZE", 2)
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron, "_token_by_asset_id", {})
+        monkeypatch.setattr(cron.settings, "BLOCK_START", 0)
+        monkeypatch.setattr(cron, "scan_window", cron.ScanWindow())
+
+        actual = await cron._scan_token_activity(
+            db_crud=mock_db_crud,
+            climate_warehouse=mock_climate_warehouse,
+            blockchain=mock_blockchain,
+        )
+
+        assert actual is True
+        assert mock_blockchain.get_activities_by_tokens.await_count == 3
+        assert mock_submit.call_args.kwargs["activities"] == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_units_mirrored_then_climate_warehouse_not_called(self, monkeypatch):
+        units = make_units(2)
+
+        mock_db_crud = mock.MagicMock()
+        mock_db_crud.select_block_state_first = mock.AsyncMock(
+            return_value=models.State(id=1, current_height=0, peak_height=100_000)
+        )
+        mock_db_crud.select_climate_warehouse_units = mock.AsyncMock(return_value=units)
+        mock_db_crud.select_tokens = mock.AsyncMock(return_value=[])
+        mock_db_crud.select_token_scanned_heights = mock.AsyncMock(return_value={})
+        mock_db_crud.select_blocks = mock.AsyncMock(return_value=[])
+        mock_climate_warehouse = mock.MagicMock()
+        mock_climate_warehouse.combine_climate_units_and_metadata = mock.AsyncMock()
+        mock_blockchain = mock.MagicMock()
+        mock_blockchain.num_coin_records = 0
+        mock_blockchain.get_header_hashes = mock.AsyncMock(return_value={})
+        mock_blockchain.get_activities_by_tokens = mock.AsyncMock(
+            side_effect=lambda tokens, **kwargs: [[] for _ in tokens]
+        )
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.settings, "SCAN_BY_PUZZLE_HASHES", True)
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron, "_token_by_asset_id", {})
+        monkeypatch.setattr(cron.settings, "BLOCK_START", 0)
+        monkeypatch.setattr(cron, "scan_window", cron.ScanWindow())
+
+        actual = await cron._scan_token_activity(
+            db_crud=mock_db_crud,
+            climate_warehouse=mock_climate_warehouse,
+            blockchain=mock_blockchain,
+        )
+
+        assert actual is True
+        mock_climate_warehouse.combine_climate_units_and_metadata.assert_not_awaited()
+        assert [
+            token.token_index.sequence_num
+            for token in mock_blockchain.get_activities_by_tokens.call_args.kwargs[
+                "tokens"
+            ]
+        ] == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_tip_tokens_scanned_while_lower_tokens_catch_up_then_success(
+        self, monkeypatch
+    ):
+        units = make_units(3)
+
+        mock_db_crud = mock.MagicMock()
+        mock_db_crud.select_block_state_first = mock.AsyncMock(
+            return_value=models.State(id=1, current_height=0, peak_height=100_000)
+        )
+        mock_db_crud.select_climate_warehouse_units = mock.AsyncMock(return_value=[])
+        mock_db_crud.select_tokens = mock.AsyncMock(return_value=[])
+        mock_db_crud.select_blocks = mock.AsyncMock(return_value=[])
+        mock_climate_warehouse = mock.MagicMock()
+        mock_climate_warehouse.combine_climate_units_and_metadata = mock.AsyncMock(
+            return_value=units
+        )
+        mock_blockchain = mock.MagicMock()
+        mock_blockchain.num_coin_records = 0
+        mock_blockchain.get_header_hashes = mock.AsyncMock(return_value={})
+
+        async def mock_get_activities_by_tokens(tokens, **kwargs):
+            # coin records are fetched, but none of them is an activity
+            mock_blockchain.num_coin_records += 5
+            return [[] for _ in tokens]
+
+        mock_blockchain.get_activities_by_tokens = mock.AsyncMock(
+            side_effect=mock_get_activities_by_tokens
+        )
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.settings, "SCAN_BY_PUZZLE_HASHES", True)
+        monkeypatch.setattr(cron.settings, "BLOCK_START", 0)
+        monkeypatch.setattr(cron.settings, "REORG_DEPTH", 100)
+        monkeypatch.setattr(cron, "scan_window", cron.ScanWindow(size=10_000))
+        monkeypatch.setattr(cron.scan_window, "update", mock.MagicMock())
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron, "_token_by_asset_id", {})
+
+        tokens = await cron.get_tokens(db_crud=mock_db_crud, climate_units=units)
+        asset_ids = [f"0x{token.tail_program_hash.hex()}" for token in tokens]
+
+        mock_submit.reset_mock()
+
+        # the first token is new, the others have been scanned up to 5_000 and 90_000
+        mock_db_crud.select_token_scanned_heights = mock.AsyncMock(
+            return_value={asset_ids[1]: 5_000, asset_ids[2]: 90_000}
+        )
+
+        actual = await cron._scan_token_activity(
+            db_crud=mock_db_crud,
+            climate_warehouse=mock_climate_warehouse,
+            blockchain=mock_blockchain,
+        )
+
+        assert actual is True
+        scanned = sorted(
+            (
+                call.kwargs["start_height"],
+                call.kwargs["end_height"],
+                call.kwargs["tokens"],
+            )
+            for call in mock_blockchain.get_activities_by_tokens.call_args_list
+        )
+        assert scanned == [
+            (0, 5_000, [tokens[0]]),
+            (5_000, 15_000, [tokens[1]]),
+            (90_000, 100_000, [tokens[2]]),
+        ]
+
+        assert cron.scan_window.update.call_args.kwargs["coin_records"] == 15
+
+        # only the tip window is deep enough to track header hashes
+        mock_blockchain.get_header_hashes.assert_awaited_once_with(
+            start_height=99_901, end_height=100_000
+        )
+
+        # only the tip window moves the state of the scanner
+        ingested = sorted(
+            (
+                call.kwargs["scanned_height"],
+                call.kwargs["current_height"],
+                call.kwargs["asset_ids"],
+            )
+            for call in mock_submit.call_args_list
+        )
+        assert ingested == [
+            (5_000, None, [asset_ids[0]]),
+            (15_000, None, [asset_ids[1]]),
+            (100_000, 100_000, [asset_ids[2]]),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_all_tokens_at_peak_then_synced(self, monkeypatch):
+        units = make_units(2)
+
+        mock_db_crud = mock.MagicMock()
+        mock_db_crud.select_block_state_first = mock.AsyncMock(
+            return_value=models.State(id=1, current_height=0, peak_height=100_000)
+        )
+        mock_db_crud.select_climate_warehouse_units = mock.AsyncMock(return_value=[])
+        mock_db_crud.select_tokens = mock.AsyncMock(return_value=[])
+        mock_db_crud.select_blocks = mock.AsyncMock(return_value=[])
+        mock_climate_warehouse = mock.MagicMock()
+        mock_climate_warehouse.combine_climate_units_and_metadata = mock.AsyncMock(
+            return_value=units
+        )
+        mock_blockchain = mock.MagicMock()
+        mock_blockchain.num_coin_records = 0
+        mock_blockchain.get_header_hashes = mock.AsyncMock(return_value={})
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron, "_token_by_asset_id", {})
+
+        tokens = await cron.get_tokens(db_crud=mock_db_crud, climate_units=units)
+        mock_db_crud.select_token_scanned_heights = mock.AsyncMock(
+            return_value={
+                f"0x{token.tail_program_hash.hex()}": 100_001 for token in tokens
+            }
+        )
+
+        actual = await cron._scan_token_activity(
+            db_crud=mock_db_crud,
+            climate_warehouse=mock_climate_warehouse,
+            blockchain=mock_blockchain,
+        )
+
+        assert actual is False
+        mock_blockchain.get_activities_by_tokens.assert_not_called()
+
+
+class TestScanWindow:
+    def test_slow_windows_then_shrink(self):
+        scan_window = cron.ScanWindow(
+            size=10_000, min_size=100, max_size=100_000, target_seconds=10.0
+        )
+
+        scan_window.update(blocks=10_000, coin_records=500, seconds=40.0)
+        assert scan_window.size == 5_000
+        assert scan_window.blocks_per_second == 250
+        assert scan_window.coin_records_per_second == 12.5
+
+        scan_window.update(blocks=5_000, coin_records=500, seconds=40.0)
+        scan_window.update(blocks=2_500, coin_records=500, seconds=40.0)
+        assert scan_window.size == 1_250
+
+    def test_fast_windows_then_grow_to_max(self):
+        scan_window = cron.ScanWindow(
+            size=10_000, min_size=100, max_size=50_000, target_seconds=10.0
+        )
+
+        for _ in range(5):
+            scan_window.update(blocks=scan_window.size, coin_records=0, seconds=1.0)
+
+        assert scan_window.size == 50_000
+
+    def test_short_fast_window_then_size_kept(self):
+        scan_window = cron.ScanWindow(size=10_000, target_seconds=10.0)
+
+        scan_window.update(blocks=1, coin_records=0, seconds=0.5)
+
+        assert scan_window.size == 10_000
+        assert scan_window.last_window_seconds == 0.5
+
+
+class TestRollbackReorg:
+    @pytest.mark.asyncio
+    async def test_diverged_header_hash_then_rollback_to_fork(self, monkeypatch):
+        mock_db_crud = mock.MagicMock()
+        mock_db_crud.select_blocks = mock.AsyncMock(
+            return_value=[
+                models.Block(height=height, header_hash=f"0x{height:064x}")
+                for height in range(100, 105)
+            ]
+        )
+        mock_blockchain = mock.MagicMock()
+        mock_blockchain.num_coin_records = 0
+        mock_blockchain.get_header_hashes = mock.AsyncMock(
+            return_value={
+                100: f"0x{100:064x}",
+                101: f"0x{101:064x}",
+                102: f"0x{0:064x}",
+                103: f"0x{0:064x}",
+            }
+        )
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+
+        actual = await cron._rollback_reorg(
+            db_crud=mock_db_crud, blockchain=mock_blockchain
+        )
+
+        assert actual is True
+        assert mock_submit.call_args.kwargs["height"] == 102
+
+    @pytest.mark.asyncio
+    async def test_heights_above_node_peak_then_no_rollback(self, monkeypatch):
+        mock_db_crud = mock.MagicMock()
+        mock_db_crud.select_blocks = mock.AsyncMock(
+            return_value=[
+                models.Block(height=height, header_hash=f"0x{height:064x}")
+                for height in range(100, 105)
+            ]
+        )
+        mock_blockchain = mock.MagicMock()
+        mock_blockchain.num_coin_records = 0
+        mock_blockchain.get_header_hashes = mock.AsyncMock(
+            return_value={100: f"0x{100:064x}", 101: f"0x{101:064x}"}
+        )
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+
+        actual = await cron._rollback_reorg(
+            db_crud=mock_db_crud, blockchain=mock_blockchain
+        )
+
+        assert actual is False
+        mock_submit.assert_not_awaited()
+
+
+class TestGetTokens:
+    @pytest.mark.asyncio
+    async def test_new_tokens_are_registered_once_then_success(self, monkeypatch):
+        units = make_units(3)
+
+        mock_db_crud = mock.MagicMock()
+        mock_db_crud.select_tokens = mock.AsyncMock(return_value=[])
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron, "_token_by_asset_id", {})
+
+        tokens = await cron.get_tokens(db_crud=mock_db_crud, climate_units=units)
+        assert [token.token_index.sequence_num for token in tokens] == [0, 1, 2]
+        assert mock_submit.call_args.kwargs["tokens"] == tokens
+
+        actual = await cron.get_tokens(db_crud=mock_db_crud, climate_units=units)
+        assert actual == tokens
+        assert mock_submit.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_split_units_then_one_token_per_asset_id(self, monkeypatch):
+        units = make_units(2)
+        units.append(units[1] | {"warehouseUnitId": "SPLIT_UNIT_ID"})
+
+        mock_db_crud = mock.MagicMock()
+        mock_db_crud.select_tokens = mock.AsyncMock(return_value=[])
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron, "_token_by_asset_id", {})
+
+        tokens = await cron.get_tokens(db_crud=mock_db_crud, climate_units=units)
+        assert [token.token_index.sequence_num for token in tokens] == [0, 1]
+
+        actual = await cron.get_tokens(db_crud=mock_db_crud, climate_units=units)
+        assert actual == tokens
+
+    @pytest.mark.asyncio
+    async def test_failed_registration_then_retried(self, monkeypatch):
+        units = make_units(2)
+
+        mock_db_crud = mock.MagicMock()
+        mock_db_crud.select_tokens = mock.AsyncMock(return_value=[])
+        mock_submit = mock.AsyncMock(side_effect=[Exception("locked"), True])
+
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron, "_token_by_asset_id", {})
+
+        with pytest.raises(Exception):
+            await cron.get_tokens(db_crud=mock_db_crud, climate_units=units)
+        assert cron._token_by_asset_id == {}
+
+        tokens = await cron.get_tokens(db_crud=mock_db_crud, climate_units=units)
+        assert mock_submit.call_args.kwargs["tokens"] == tokens
+        assert len(cron._token_by_asset_id) == 2
+
+    @pytest.mark.asyncio
+    async def test_registered_tokens_skip_puzzle_hashing_then_success(
+        self, monkeypatch
+    ):
+        token = ClimateToken(
+            token_index=ClimateTokenIndex(
+                org_uid="ORG_UID",
+                warehouse_project_id="WAREHOUSE_PROJECT_ID",
+                vintage_year=2050,
+                sequence_num=0,
+            ),
+            root_public_key=G1Element.generator(),
+            tail_program_hash=bytes32(b"\x01" * 32),
+            gateway_cat_puzzle_hash=bytes32(b"\x02" * 32),
+        )
+        units = [{"marketplaceIdentifier": "01" * 32, "token": {}}]
+
+        mock_db_crud = mock.MagicMock()
+        mock_db_crud.select_tokens = mock.AsyncMock(return_value=[token])
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron, "_token_by_asset_id", {})
+
+        actual = await cron.get_tokens(db_crud=mock_db_crud, climate_units=units)
+        assert actual == [token]
+        mock_submit.assert_not_awaited()
+
+
+class TestOnNewPeak:
+    @pytest.mark.asyncio
+    async def test_new_peak_then_scan_woken(self, monkeypatch):
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron, "scan_event", asyncio.Event())
+        monkeypatch.setattr(cron, "is_scanner_leader", True)
+
+        await cron._on_new_peak(100)
+
+        assert mock_submit.call_args.kwargs["peak_height"] == 100
+        assert cron.scan_event.is_set()
+
+    @pytest.mark.asyncio
+    async def test_not_scanner_leader_then_skipped(self, monkeypatch):
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron, "scan_event", asyncio.Event())
+        monkeypatch.setattr(cron, "is_scanner_leader", False)
+
+        await cron._on_new_peak(100)
+
+        mock_submit.assert_not_awaited()
+        assert not cron.scan_event.is_set()
+
+
+class TestRunScanTokenActivity:
+    @pytest.mark.asyncio
+    async def test_lease_lost_while_catching_up_then_stopped(self, monkeypatch):
+        async def mock_get_resource():
+            yield mock.MagicMock()
+
+        async def mock_scan_token_activity(**kwargs):
+            # the lease renewal runs between two windows and loses the lease
+            monkeypatch.setattr(cron, "is_scanner_leader", False)
+            return True
+
+        mock_scan = mock.AsyncMock(side_effect=mock_scan_token_activity)
+
+        monkeypatch.setattr(cron.deps, "get_db_session", mock_get_resource)
+        monkeypatch.setattr(cron.deps, "get_full_node_rpc_client", mock_get_resource)
+        monkeypatch.setattr(cron, "_scan_token_activity", mock_scan)
+        monkeypatch.setattr(cron, "lock", asyncio.Lock())
+        monkeypatch.setattr(cron, "is_scanner_leader", True)
+
+        await cron._run_scan_token_activity()
+
+        assert mock_scan.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_scan_running_then_new_peak_scanned_after_it(self, monkeypatch):
+        async def mock_get_resource():
+            yield mock.MagicMock()
+
+        mock_scan = mock.AsyncMock(return_value=False)
+
+        monkeypatch.setattr(cron.deps, "get_db_session", mock_get_resource)
+        monkeypatch.setattr(cron.deps, "get_full_node_rpc_client", mock_get_resource)
+        monkeypatch.setattr(cron, "_scan_token_activity", mock_scan)
+        monkeypatch.setattr(cron, "lock", asyncio.Lock())
+        monkeypatch.setattr(cron, "is_scanner_leader", True)
+
+        await cron.lock.acquire()
+        task = asyncio.create_task(cron._run_scan_token_activity(wait=True))
+        await asyncio.sleep(0.01)
+        mock_scan.assert_not_awaited()
+
+        cron.lock.release()
+        await asyncio.wait_for(task, timeout=1)
+        assert mock_scan.await_count == 1
+
+
+class TestSyncClimateWareHouse:
+    @pytest.mark.asyncio
+    async def test_climate_warehouse_empty_then_sync_skipped(self, monkeypatch):
+        mock_climate_warehouse = mock.MagicMock()
+        mock_climate_warehouse.combine_climate_units_and_metadata = mock.AsyncMock(
+            return_value=[]
+        )
+        mock_submit = mock.AsyncMock(return_value={})
+
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+
+        actual = await cron._sync_climate_warehouse(
+            climate_warehouse=mock_climate_warehouse
+        )
+
+        assert actual == {}
+        mock_submit.assert_not_awaited()
+
+
+@pytest.fixture(scope="function")
+def lease_db_session_cls(monkeypatch, tmp_path):
+    Engine = create_engine(
+        f"sqlite:///{tmp_path / 'lease.sqlite'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(Engine)
+    SessionLocal = sessionmaker(bind=Engine)
+
+    async def mock_get_db_session():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(cron.deps, "get_db_session", mock_get_db_session)
+    return SessionLocal
+
+
+class TestRenewScannerLease:
+    @pytest.mark.asyncio
+    async def test_lease_acquired_then_lost(self, monkeypatch, lease_db_session_cls):
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron.settings, "SCANNER_ENABLED", True)
+        monkeypatch.setattr(cron, "is_scanner_leader", False)
+
+        await cron.renew_scanner_lease.__wrapped__()
+        assert cron.is_scanner_leader
+
+        # renewals do not queue up behind the writes of the scanner
+        mock_submit.assert_not_awaited()
+
+        db_crud = DBCrud(db=lease_db_session_cls())
+        assert db_crud.release_lease(name="scanner", holder=cron.scanner_id)
+        assert db_crud.acquire_lease(name="scanner", holder="OTHER", seconds=30)
+
+        await cron.renew_scanner_lease.__wrapped__()
+        assert not cron.is_scanner_leader
+
+    @pytest.mark.asyncio
+    async def test_shutdown_then_lease_released(
+        self, monkeypatch, lease_db_session_cls
+    ):
+        monkeypatch.setattr(cron.settings, "SCANNER_ENABLED", True)
+        monkeypatch.setattr(cron, "is_scanner_leader", False)
+
+        await cron.renew_scanner_lease.__wrapped__()
+        assert cron.is_scanner_leader
+
+        await cron.close_scanner_lease()
+        assert not cron.is_scanner_leader
+
+        db_crud = DBCrud(db=lease_db_session_cls())
+        assert db_crud.acquire_lease(name="scanner", holder="OTHER", seconds=30)
+
+    @pytest.mark.asyncio
+    async def test_scanner_disabled_then_never_leader(self, monkeypatch):
+        mock_submit = mock.AsyncMock(return_value=True)
+
+        monkeypatch.setattr(cron.db_writer, "submit", mock_submit)
+        monkeypatch.setattr(cron.settings, "SCANNER_ENABLED", False)
+        monkeypatch.setattr(cron, "is_scanner_leader", False)
+
+        await cron.renew_scanner_lease.__wrapped__()
+
+        mock_submit.assert_not_awaited()
+        assert not cron.is_scanner_leader
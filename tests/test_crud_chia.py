@@ -1,28 +1,44 @@
+import asyncio
 from unittest import mock
+
+import pytest
+from aiohttp import web
+from fastapi import HTTPException
+
 from app import crud
 
 
+def mock_unit_pages(*pages):
+    async def iter_climate_unit_pages(self, search, **kwargs):
+        for units in pages:
+            yield units
+
+    return iter_climate_unit_pages
+
+
 class TestClimateWareHouseCrud:
-    def test_combine_climate_units_and_metadata_empty_units_then_success(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_combine_climate_units_and_metadata_empty_units_then_success(self, monkeypatch):
         test_request = {}
         test_response = []
 
-        mock_units = mock.MagicMock()
+        mock_units = mock.AsyncMock()
         mock_units.return_value = []
 
-        monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_units", mock_units)
+        monkeypatch.setattr(crud.ClimateWareHouseCrud, "iter_climate_unit_pages", mock_unit_pages(mock_units.return_value))
 
-        response = crud.ClimateWareHouseCrud(url=mock.MagicMock()).combine_climate_units_and_metadata(
+        response = await crud.ClimateWareHouseCrud(url=mock.MagicMock()).combine_climate_units_and_metadata(
             search=test_request)
 
         assert response == test_response
 
-    def test_combine_climate_units_and_metadata_empty_projects_then_success(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_combine_climate_units_and_metadata_empty_projects_then_success(self, monkeypatch):
         test_request = {}
         test_response = []
 
-        mock_units = mock.MagicMock()
-        mock_projects = mock.MagicMock()
+        mock_units = mock.AsyncMock()
+        mock_projects = mock.AsyncMock()
         mock_units.return_value = [
             {
                 "warehouseUnitId": "a9fbe47e-d308-4c4c-8eb5-c06dd09b0716",
@@ -69,14 +85,15 @@ class TestClimateWareHouseCrud:
         mock_projects.return_value = []
 
         monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_projects", mock_projects)
-        monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_units", mock_units)
+        monkeypatch.setattr(crud.ClimateWareHouseCrud, "iter_climate_unit_pages", mock_unit_pages(mock_units.return_value))
 
-        response = crud.ClimateWareHouseCrud(url=mock.MagicMock()).combine_climate_units_and_metadata(
+        response = await crud.ClimateWareHouseCrud(url=mock.MagicMock()).combine_climate_units_and_metadata(
             search=test_request)
 
         assert response == test_response
 
-    def test_combine_climate_units_and_metadata_empty_orgs_then_success(self, monkeypatch):
+    @pytest.mark.asyncio
+    async def test_combine_climate_units_and_metadata_empty_orgs_then_success(self, monkeypatch):
         test_request = {}
         test_response = [{
             "correspondingAdjustmentDeclaration": "Committed",
@@ -98,7 +115,6 @@ class TestClimateWareHouseCrud:
                 "warehouseProjectId": "c9b98579-debb-49f3-b417-0adbae4ed5c7"
             },
             "issuanceId": '18cfe2ba-faea-4f26-a69d-07ab6a6e886e',
-            "labels": [],
             "marketplace": None,
             "marketplaceIdentifier": '8df0a9aa3739e24467b8a6409b49efe355dd4999a51215aed1f944314af07c60',
             "marketplaceLink": None,
@@ -116,7 +132,28 @@ class TestClimateWareHouseCrud:
             "projectLocationId": None,
             "serialNumberBlock": "ABC100-ABC200",
             "timeStaged": "1666592541",
-            "token": {},
+            "token": {
+                "org_uid": "cf7af8da584b6c115ba8247c5cdd05506c3b3c5c632ed975cc2b16262493e2bd",
+                "warehouse_project_id": "c9b98579-debb-49f3-b417-0adbae4ed5c7",
+                "vintage_year": 2099,
+                "sequence_num": 0,
+                "index": "0x8b0aa9633464b5437f4b980b864a3ab5dda49e6a754ef2b1cde6d30fb28a9330",
+                "public_key": "0x9650dc15356ba1fe3a48e50daa55ac3dfde5323226922c9bf09aae1bd9612105f323e573cfa0778c681467a0c62bc315",
+                "asset_id": "0x8df0a9aa3739e24467b8a6409b49efe355dd4999a51215aed1f944314af07c60",
+                "tokenization": {
+                    "mod_hash": "0xbe97af91e9833541c4c5dd0ab08bad1b0653cccd96e56ae43b7314469e458f5b",
+                    "public_key": "0x8cba9cb11eed6e2a04843d94c9cabecc3f8eb3118f3a4c1dd5260684f462a8c886db5963f2dcac03f54a745a42777e7c"
+                },
+                "detokenization": {
+                    "mod_hash": "0xed13201cb8b52b4c7ef851e220a3d2bddd57120e6e6afde2aabe3fcc400765ea",
+                    "public_key": "0xb431835fe9fa64e9bea1bbab1d4bffd15d17d997f3754b2f97c8db43ea173a8b9fa79ac3a7d58c80111fbfdd4e485f0d",
+                    "signature": "0xa627c8779c2d8096444d44879294c7d963180c166564e9c9569c23c3a744af514aae03aeaa5e2d5fd12d0c008c1630410e9d4516b58863658f7ac5b35d09d8810fb28ed43b3f6243c645f0bd934b434aac87cd5718dafd87b51d8bf9c821ba24"
+                },
+                "permissionless_retirement": {
+                    "mod_hash": "0x36ab0a0666149598070b7c40ab10c3aaff51384d4ad4544a1c301636e917c039",
+                    "signature": "0xaa1f6b71999333761fbd9eb914ce5ab1c3acb83e7fa7eb5b59c226f20b644c835f8238edbe3ddfeed1a916f0307fe1200174a211b8169ace5afcd9162f88b46565f3ffbbf6dfdf8d154e6337e30829c23ab3f6796d9a319bf0d9168685541d62"
+                }
+            },
             "unitBlockEnd": "ABC200",
             "unitBlockStart": "ABC100",
             "unitCount": 100,
@@ -130,7 +167,7 @@ class TestClimateWareHouseCrud:
             "vintageYear": 2099,
             "warehouseUnitId": "a9fbe47e-d308-4c4c-8eb5-c06dd09b0716",
             "project": {
-                "warehouseProjectId": "fce35ee2-bdf1-47d8-9397-345334ff804b",
+                "warehouseProjectId": "c9b98579-debb-49f3-b417-0adbae4ed5c7",
                 "orgUid": "cf7af8da584b6c115ba8247c5cdd05506c3b3c5c632ed975cc2b16262493e2bd",
                 "currentRegistry": None,
                 "projectId": "c9d147e2-bc07-4e68-a76d-43424fa8cd4e",
@@ -166,10 +203,10 @@ class TestClimateWareHouseCrud:
             }
         }]
 
-        mock_units = mock.MagicMock()
-        mock_projects = mock.MagicMock()
-        mock_orgs = mock.MagicMock()
-        mock_org_metadata = mock.MagicMock()
+        mock_units = mock.AsyncMock()
+        mock_projects = mock.AsyncMock()
+        mock_orgs = mock.AsyncMock()
+        mock_org_metadata = mock.AsyncMock()
         mock_units.return_value = [
             {
                 "warehouseUnitId": "a9fbe47e-d308-4c4c-8eb5-c06dd09b0716",
@@ -215,7 +252,7 @@ class TestClimateWareHouseCrud:
         ]
         mock_projects.return_value = [
             {
-                "warehouseProjectId": "fce35ee2-bdf1-47d8-9397-345334ff804b",
+                "warehouseProjectId": "c9b98579-debb-49f3-b417-0adbae4ed5c7",
                 "orgUid": "cf7af8da584b6c115ba8247c5cdd05506c3b3c5c632ed975cc2b16262493e2bd",
                 "currentRegistry": None,
                 "projectId": "c9d147e2-bc07-4e68-a76d-43424fa8cd4e",
@@ -267,12 +304,246 @@ class TestClimateWareHouseCrud:
         }
 
         monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_projects", mock_projects)
-        monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_units", mock_units)
+        monkeypatch.setattr(crud.ClimateWareHouseCrud, "iter_climate_unit_pages", mock_unit_pages(mock_units.return_value))
         monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_organizations", mock_orgs)
         monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_organizations_metadata", mock_org_metadata)
 
-        response = crud.ClimateWareHouseCrud(url=mock.MagicMock()).combine_climate_units_and_metadata(
+        response = await crud.ClimateWareHouseCrud(url=mock.MagicMock()).combine_climate_units_and_metadata(
             search=test_request)
 
         assert response == test_response
 
+    @pytest.mark.asyncio
+    async def test_combine_climate_units_and_metadata_only_unit_orgs_then_success(
+        self, monkeypatch
+    ):
+        units = [
+            {
+                "marketplaceIdentifier": f"{index:064x}",
+                "orgUid": f"ORG_UID_{index % 2}",
+                "issuance": {"warehouseProjectId": "WAREHOUSE_PROJECT_ID"},
+            }
+            for index in range(4)
+        ]
+        projects = [{"warehouseProjectId": "WAREHOUSE_PROJECT_ID"}]
+        orgs = {f"ORG_UID_{index}": {"orgUid": f"ORG_UID_{index}"} for index in range(3)}
+
+        in_flight = 0
+        max_in_flight = 0
+
+        async def get_metadata(org_uid):
+            nonlocal in_flight, max_in_flight
+
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+            return {}
+
+        mock_org_metadata = mock.AsyncMock(side_effect=get_metadata)
+
+        monkeypatch.setattr(crud.ClimateWareHouseCrud, "iter_climate_unit_pages", mock_unit_pages(units[:2], units[2:]))
+        monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_projects", mock.AsyncMock(return_value=projects))
+        monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_organizations", mock.AsyncMock(return_value=orgs))
+        monkeypatch.setattr(crud.ClimateWareHouseCrud, "get_climate_organizations_metadata", mock_org_metadata)
+        monkeypatch.setattr(crud.chia.settings, "CADT_METADATA_CONCURRENCY", 1)
+
+        response = await crud.ClimateWareHouseCrud(url=mock.MagicMock()).combine_climate_units_and_metadata(
+            search={})
+
+        assert len(response) == 4
+        assert [call.args[0] for call in mock_org_metadata.call_args_list] == [
+            "ORG_UID_0",
+            "ORG_UID_1",
+        ]
+        assert max_in_flight == 1
+
+
+class TestClimateWareHouseApi:
+    async def _serve(self, handlers):
+        app = web.Application()
+        for (path, handler) in handlers.items():
+            app.router.add_get(path, handler)
+
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        return (runner, f"http://127.0.0.1:{port}")
+
+    @pytest.mark.asyncio
+    async def test_get_climate_data_then_success(self):
+        requests = []
+
+        async def handler(request: web.Request) -> web.Response:
+            requests.append(request)
+            return web.json_response({"path": request.path, **request.query})
+
+        async def units_handler(request: web.Request) -> web.Response:
+            # a server without pagination
+            requests.append(request)
+            return web.json_response([{"path": request.path, **request.query}])
+
+        (runner, url) = await self._serve(
+            {
+                "/v1/units": units_handler,
+                "/v1/projects": handler,
+                "/v1/organizations": handler,
+                "/v1/organizations/metadata": handler,
+            }
+        )
+        try:
+            climate_warehouse = crud.ClimateWareHouseCrud(url=url, api_key="API_KEY")
+
+            assert await climate_warehouse.get_climate_units({"search": "abc"}) == [
+                {"path": "/v1/units", "search": "abc", "page": "1", "limit": "100"}
+            ]
+            assert await climate_warehouse.get_climate_projects() == {
+                "path": "/v1/projects"
+            }
+            assert await climate_warehouse.get_climate_organizations() == {
+                "path": "/v1/organizations"
+            }
+            assert await climate_warehouse.get_climate_organizations_metadata(
+                "ORG_UID"
+            ) == {"path": "/v1/organizations/metadata", "orgUid": "ORG_UID"}
+
+            assert all(
+                request.headers["x-api-key"] == "API_KEY" for request in requests
+            )
+            # all calls go through one keep-alive connection
+            assert len({request.transport for request in requests}) == 1
+
+        finally:
+            await crud.close_climate_warehouse_session()
+            crud.climate_warehouse_cache.clear()
+            await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_slow_server_then_timeout(self):
+        async def handler(request: web.Request) -> web.Response:
+            await asyncio.sleep(1)
+            return web.json_response([])
+
+        (runner, url) = await self._serve({"/v1/projects": handler})
+        try:
+            climate_warehouse = crud.ClimateWareHouseCrud(url=url)
+
+            with pytest.raises(HTTPException) as e:
+                await climate_warehouse.get_climate_projects(timeout=0.1)
+            assert e.value.detail == "Call Climate API Timeout"
+
+        finally:
+            await crud.close_climate_warehouse_session()
+            crud.climate_warehouse_cache.clear()
+            await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_error_status_then_failure(self):
+        async def handler(request: web.Request) -> web.Response:
+            return web.Response(status=500, text="Internal Server Error")
+
+        (runner, url) = await self._serve({"/v1/organizations": handler})
+        try:
+            climate_warehouse = crud.ClimateWareHouseCrud(url=url)
+
+            with pytest.raises(HTTPException) as e:
+                await climate_warehouse.get_climate_organizations()
+            assert e.value.detail == "Call Climate API Failure"
+
+        finally:
+            await crud.close_climate_warehouse_session()
+            crud.climate_warehouse_cache.clear()
+            await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_expired_projects_then_stale_served_and_revalidated(
+        self, monkeypatch
+    ):
+        calls = []
+
+        async def handler(request: web.Request) -> web.Response:
+            calls.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return web.Response(status=304)
+
+            await asyncio.sleep(0.05)
+            return web.json_response([{"warehouseProjectId": "ID"}], headers={"ETag": '"v1"'})
+
+        monkeypatch.setattr(crud.chia.settings, "CADT_PROJECTS_TTL", 60)
+        cache = crud.chia.ClimateWareHouseCache()
+        monkeypatch.setattr(crud.chia, "climate_warehouse_cache", cache)
+
+        (runner, url) = await self._serve({"/v1/projects": handler})
+        try:
+            climate_warehouse = crud.ClimateWareHouseCrud(url=url)
+
+            # concurrent misses share one call
+            results = await asyncio.gather(
+                climate_warehouse.get_climate_projects(),
+                climate_warehouse.get_climate_projects(),
+            )
+            assert results == [[{"warehouseProjectId": "ID"}]] * 2
+            assert await climate_warehouse.get_climate_projects() == results[0]
+            assert calls == [None]
+
+            for entry in cache._entries.values():
+                entry.expires_at = 0
+
+            # the stale entry is served while it is revalidated in the background
+            assert await climate_warehouse.get_climate_projects() == results[0]
+            await asyncio.gather(*cache._tasks.values())
+            assert await climate_warehouse.get_climate_projects() == results[0]
+            assert calls == [None, '"v1"']
+
+            assert cache.to_schema().dict() == {
+                "entries": 1,
+                "hits": 2,
+                "stale_hits": 1,
+                "misses": 2,
+                "revalidations": 1,
+            }
+
+        finally:
+            await crud.close_climate_warehouse_session()
+            await runner.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_get_climate_units_by_page_then_success(self):
+        units = [{"warehouseUnitId": f"UNIT_{index}"} for index in range(5)]
+        pages = []
+
+        async def handler(request: web.Request) -> web.Response:
+            page = int(request.query["page"])
+            limit = int(request.query["limit"])
+            pages.append((page, limit, request.query["search"]))
+
+            return web.json_response(
+                {
+                    "page": page,
+                    "pageCount": 3,
+                    "data": units[(page - 1) * limit : page * limit],
+                }
+            )
+
+        (runner, url) = await self._serve({"/v1/units": handler})
+        try:
+            climate_warehouse = crud.ClimateWareHouseCrud(url=url)
+
+            actual = [
+                units
+                async for units in climate_warehouse.iter_climate_unit_pages(
+                    {"search": "abc"}, page_size=2
+                )
+            ]
+            assert actual == [units[0:2], units[2:4], units[4:5]]
+            assert pages == [(1, 2, "abc"), (2, 2, "abc"), (3, 2, "abc")]
+
+            assert await climate_warehouse.get_climate_units({"search": "abc"}) == units
+
+        finally:
+            await crud.close_climate_warehouse_session()
+            await runner.cleanup()
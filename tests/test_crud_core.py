@@ -1,6 +1,18 @@
 from unittest import mock
 
-from app.crud.db import DBCrud
+import pytest
+from blspy import G1Element
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schemas
+from app.api.v1 import activities
+from app.config import settings
+from app.core.climate_wallet.wallet import ClimateObserverWallet
+from app.core.types import ClimateTokenIndex
+from app.crud.db import AsyncDBCrud, DBCrud
+from app.db.base import Base
+from app.db.migrations import run_migrations
 
 
 class TestUpdateBlockState:
@@ -13,3 +25,460 @@ class TestUpdateBlockState:
         mock_db = mock.MagicMock()
         actual = DBCrud(db=mock_db).update_block_state(current_height=1)
         assert actual is True
+
+
+class TestAsyncDBCrud:
+    @pytest.mark.asyncio
+    async def test_update_block_state_then_success(self):
+        mock_db = mock.MagicMock()
+        actual = await AsyncDBCrud(db=mock_db).update_block_state(peak_height=1)
+        assert actual is True
+        mock_db.commit.assert_called_once()
+
+
+class TestBatchInsertIgnoreActivity:
+    def test_with_duplicates_then_success(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+
+        db = sessionmaker(bind=Engine)()
+        activity = schemas.Activity(
+            org_uid="ORG_UID",
+            warehouse_project_id="WAREHOUSE_PROJECT_ID",
+            vintage_year=2050,
+            sequence_num=0,
+            asset_id="0x438f0630bebb927cbef0663b6b4bfb1820a754975e25a8ef20fb10b6c616c4de",
+            beneficiary_name="",
+            beneficiary_address=None,
+            beneficiary_puzzle_hash="0xe122763ec4076d3fa356fbff8bb63d1f9d78b52c3c577a01140cd4559ee32966",
+            coin_id="0x40fd5fec70b2e7e3ab110a0ac22feb67f24fe989d7f2c7018c694faeea41c40f",
+            height=1720476,
+            amount=10000,
+            mode="PERMISSIONLESS_RETIREMENT",
+            metadata={"bn": ""},
+            timestamp=1666843885,
+        )
+
+        actual = DBCrud(db=db).batch_insert_ignore_activity([activity, activity])
+        assert actual is True
+
+        db_activities = db.query(models.Activity).all()
+        assert len(db_activities) == 1
+        assert db_activities[0].asset_id == (
+            "0x438f0630bebb927cbef0663b6b4bfb1820a754975e25a8ef20fb10b6c616c4de"
+        )
+        assert db_activities[0].mode == "PERMISSIONLESS_RETIREMENT"
+        assert db_activities[0].metadata_ == {"bn": ""}
+        assert db_activities[0].created_at is not None
+
+
+class TestIngestActivityWindow:
+    def _make_db(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+
+        db = sessionmaker(bind=Engine)()
+        db.add(models.State(id=1, current_height=1, peak_height=None))
+        db.commit()
+        return db
+
+    def _make_activity(self):
+        return schemas.Activity(
+            org_uid="ORG_UID",
+            warehouse_project_id="WAREHOUSE_PROJECT_ID",
+            vintage_year=2050,
+            sequence_num=0,
+            asset_id="0x438f0630bebb927cbef0663b6b4bfb1820a754975e25a8ef20fb10b6c616c4de",
+            beneficiary_name="",
+            beneficiary_address=None,
+            beneficiary_puzzle_hash=None,
+            coin_id="0x40fd5fec70b2e7e3ab110a0ac22feb67f24fe989d7f2c7018c694faeea41c40f",
+            height=1720476,
+            amount=10000,
+            mode="PERMISSIONLESS_RETIREMENT",
+            metadata={},
+            timestamp=1666843885,
+        )
+
+    def test_with_activities_then_success(self):
+        db = self._make_db()
+
+        actual = DBCrud(db=db).ingest_activity_window(
+            activities=[self._make_activity()], current_height=100
+        )
+
+        assert actual is True
+        assert db.query(models.Activity).count() == 1
+        assert db.query(models.State).first().current_height == 100
+
+    def test_with_state_failure_then_rollback(self, monkeypatch):
+        db = self._make_db()
+
+        mock_update_block_state = mock.MagicMock(side_effect=ValueError())
+        monkeypatch.setattr(DBCrud, "update_block_state", mock_update_block_state)
+
+        with pytest.raises(ValueError):
+            DBCrud(db=db).ingest_activity_window(
+                activities=[self._make_activity()], current_height=100
+            )
+
+        assert db.query(models.Activity).count() == 0
+        assert db.query(models.State).first().current_height == 1
+
+    def test_with_asset_ids_then_scanned_heights_updated(self):
+        db = self._make_db()
+        db.add(models.Token(asset_id="0x01"))
+        db.add(models.Token(asset_id="0x02"))
+        db.commit()
+
+        db_crud = DBCrud(db=db)
+        actual = db_crud.ingest_activity_window(
+            activities=[self._make_activity()],
+            current_height=100,
+            asset_ids=["0x01"],
+        )
+
+        assert actual is True
+        assert db_crud.select_token_scanned_heights() == {"0x01": 100, "0x02": None}
+
+    def test_with_header_hashes_then_latest_kept(self, monkeypatch):
+        monkeypatch.setattr(settings, "REORG_DEPTH", 3)
+        db = self._make_db()
+
+        db_crud = DBCrud(db=db)
+        db_crud.ingest_activity_window(
+            activities=[],
+            current_height=105,
+            header_hashes={height: f"0x{height:064x}" for height in range(100, 105)},
+        )
+
+        assert [block.height for block in db_crud.select_blocks()] == [102, 103, 104]
+
+
+class TestRollbackToHeight:
+    def test_with_fork_height_then_success(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+        db = sessionmaker(bind=Engine)()
+
+        db.add(models.State(id=1, current_height=1_720_500, peak_height=1_720_500))
+        db.add(models.Token(asset_id="0x01", scanned_height=1_720_500))
+        db.add(models.Token(asset_id="0x02", scanned_height=1_000_000))
+        db.add(models.Block(height=1_720_476, header_hash="0x01"))
+        db.add(models.Block(height=1_720_477, header_hash="0x02"))
+        db.commit()
+
+        db_crud = DBCrud(db=db)
+        db_crud.batch_insert_ignore_activity(
+            [TestIngestActivityWindow()._make_activity()]
+        )
+
+        actual = db_crud.rollback_to_height(1_720_477)
+
+        assert actual is True
+        assert db.query(models.Activity).count() == 1
+        assert [block.height for block in db_crud.select_blocks()] == [1_720_476]
+        assert db_crud.select_token_scanned_heights() == {
+            "0x01": 1_720_477,
+            "0x02": 1_000_000,
+        }
+        assert db.query(models.State).first().current_height == 1_720_477
+
+        db_crud.rollback_to_height(1_720_476)
+        assert db.query(models.Activity).count() == 0
+
+
+class TestActivitySearchFilter:
+    def test_with_prefix_terms_then_success(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+        run_migrations(Engine)
+
+        db = sessionmaker(bind=Engine)()
+        db_crud = DBCrud(db=db)
+        db_crud.batch_insert_ignore_activity(
+            [
+                schemas.Activity(
+                    org_uid="ORG_UID",
+                    warehouse_project_id="WAREHOUSE_PROJECT_ID",
+                    vintage_year=2050,
+                    sequence_num=0,
+                    asset_id="0x438f0630bebb927cbef0663b6b4bfb1820a754975e25a8ef20fb10b6c616c4de",
+                    beneficiary_name="Green Energy",
+                    beneficiary_address=None,
+                    beneficiary_puzzle_hash="0xe122763ec4076d3fa356fbff8bb63d1f9d78b52c3c577a01140cd4559ee32966",
+                    coin_id="0x40fd5fec70b2e7e3ab110a0ac22feb67f24fe989d7f2c7018c694faeea41c40f",
+                    height=1720476,
+                    amount=10000,
+                    mode="PERMISSIONLESS_RETIREMENT",
+                    metadata={"bn": "Green Energy"},
+                    timestamp=1666843885,
+                )
+            ]
+        )
+
+        for (search, expected) in [
+            ("gre ener", 1),
+            ("0xe12276", 1),
+            ("e12276", 1),
+            ("blue", 0),
+            ("!!! ---", 0),
+            ("  ", 0),
+        ]:
+            search_filter = db_crud.activity_search_filter(search)
+            assert db.query(models.Activity).filter(search_filter).count() == expected
+
+
+class TestTokenRegistry:
+    def test_insert_then_select_tokens_then_success(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+
+        db = sessionmaker(bind=Engine)()
+        token = ClimateObserverWallet(
+            token_index=ClimateTokenIndex(
+                org_uid="ORG_UID",
+                warehouse_project_id="WAREHOUSE_PROJECT_ID",
+                vintage_year=2050,
+                sequence_num=0,
+            ),
+            root_public_key=G1Element.generator(),
+            full_node_client=None,
+        ).token
+
+        db_crud = DBCrud(db=db)
+        assert db_crud.batch_insert_ignore_token([token, token]) is True
+
+        actual = db_crud.select_tokens()
+        assert actual == [token]
+        assert db.query(models.Token).first().index_hash == (
+            f"0x{token.token_index.name().hex()}"
+        )
+
+
+class TestBackfill:
+    def test_ingest_window_then_finish_then_success(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+        db = sessionmaker(bind=Engine)()
+
+        db.add(models.State(id=1, current_height=100, peak_height=None))
+        db.add(models.Token(id=1, asset_id="0x01", scanned_height=None))
+        db.add(models.Token(id=2, asset_id="0x02", scanned_height=5_000))
+        db.add(models.Token(id=3, asset_id="0x03", scanned_height=None))
+        db.commit()
+
+        db_crud = DBCrud(db=db)
+        db_crud.create_backfill_shards(heights=[(100, 200), (200, 300)], max_token_id=2)
+        shards = db_crud.select_backfill_shards()
+        assert [shard.scanned_height for shard in shards] == [100, 200]
+
+        db_crud.ingest_backfill_window(
+            activities=[TestIngestActivityWindow()._make_activity()],
+            shard_id=shards[0].id,
+            scanned_height=200,
+        )
+        assert db.query(models.Activity).count() == 1
+        assert db_crud.select_backfill_shards()[0].scanned_height == 200
+
+        db_crud.finish_backfill(joined_height=300, max_token_id=2)
+        assert db_crud.select_token_scanned_heights() == {
+            "0x01": 300,
+            "0x02": 5_000,
+            "0x03": None,
+        }
+        assert db.query(models.State).first().current_height == 300
+
+
+class TestAcquireLease:
+    def test_held_lease_then_refused_until_expired(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+        db_crud = DBCrud(db=sessionmaker(bind=Engine)())
+
+        assert db_crud.acquire_lease(name="scanner", holder="a", seconds=30)
+        assert not db_crud.acquire_lease(name="scanner", holder="b", seconds=30)
+        assert db_crud.acquire_lease(name="scanner", holder="a", seconds=-1)
+        assert db_crud.acquire_lease(name="scanner", holder="b", seconds=30)
+        assert not db_crud.acquire_lease(name="scanner", holder="a", seconds=30)
+
+    def test_released_lease_then_taken_over(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+        db_crud = DBCrud(db=sessionmaker(bind=Engine)())
+
+        assert db_crud.acquire_lease(name="scanner", holder="a", seconds=30)
+        assert not db_crud.release_lease(name="scanner", holder="b")
+        assert db_crud.release_lease(name="scanner", holder="a")
+        assert db_crud.acquire_lease(name="scanner", holder="b", seconds=30)
+
+
+class TestSyncClimateWareHouse:
+    def _select_activities_joined_with_mirror(self, db_crud: DBCrud, filters: list):
+        return db_crud.select_activity_with_pagination(
+            model=activities.ACTIVITY_WITH_CW_MODEL,
+            filters={"or": [], "and": filters},
+            order_by=[models.Activity.height, models.Activity.id],
+            limit=10,
+            page=1,
+            joins=activities.ACTIVITY_WITH_CW_JOINS,
+        )
+
+    def _make_climate_unit(self, index: int, org_uid: str = "ORG_UID"):
+        return {
+            "warehouseUnitId": f"UNIT_{index}",
+            "marketplaceIdentifier": f"{index:064x}",
+            "orgUid": org_uid,
+            "organization": {"orgUid": org_uid},
+            "project": {"warehouseProjectId": "PROJECT_ID", "orgUid": org_uid},
+            "token": {"asset_id": f"0x{index:064x}"},
+        }
+
+    def test_sync_then_only_changes_written(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+        db = sessionmaker(bind=Engine)()
+        db_crud = DBCrud(db=db)
+
+        actual = db_crud.sync_climate_warehouse(
+            climate_units=[self._make_climate_unit(0), self._make_climate_unit(1)]
+        )
+        assert actual == {"cw_unit": 2, "cw_project": 1, "cw_org": 1}
+
+        actual = db_crud.sync_climate_warehouse(
+            climate_units=[self._make_climate_unit(0), self._make_climate_unit(1)]
+        )
+        assert actual == {"cw_unit": 0, "cw_project": 0, "cw_org": 0}
+
+        climate_unit = self._make_climate_unit(1)
+        climate_unit["unitStatus"] = "Retired"
+        actual = db_crud.sync_climate_warehouse(climate_units=[climate_unit])
+        assert actual == {"cw_unit": 2, "cw_project": 0, "cw_org": 0}
+
+        units = db.query(models.ClimateWareHouseUnit).all()
+        assert [unit.warehouse_unit_id for unit in units] == ["UNIT_1"]
+        assert units[0].asset_id == f"0x{1:064x}"
+        assert units[0].data["unitStatus"] == "Retired"
+        assert units[0].token == {"asset_id": f"0x{1:064x}"}
+
+    def test_select_mirrored_units_then_success(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+        db = sessionmaker(bind=Engine)()
+        db_crud = DBCrud(db=db)
+
+        db_crud.sync_climate_warehouse(
+            climate_units=[self._make_climate_unit(1), self._make_climate_unit(0)]
+        )
+
+        actual = db_crud.select_climate_warehouse_units()
+        assert [unit["warehouseUnitId"] for unit in actual] == ["UNIT_0", "UNIT_1"]
+        assert actual[1]["marketplaceIdentifier"] == f"{1:064x}"
+        assert actual[1]["token"] == {"asset_id": f"0x{1:064x}"}
+
+    def test_sync_without_units_then_mirror_kept(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+        db = sessionmaker(bind=Engine)()
+        db_crud = DBCrud(db=db)
+
+        db_crud.sync_climate_warehouse(
+            climate_units=[self._make_climate_unit(0), self._make_climate_unit(1)]
+        )
+
+        actual = db_crud.sync_climate_warehouse(climate_units=[])
+        assert actual == {"cw_unit": 0, "cw_project": 0, "cw_org": 0}
+
+        assert db.query(models.ClimateWareHouseUnit).count() == 2
+        assert db.query(models.ClimateWareHouseProject).count() == 1
+        assert db.query(models.ClimateWareHouseOrganization).count() == 1
+
+    def test_select_activities_joined_with_mirror_then_success(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+        db = sessionmaker(bind=Engine)()
+        db_crud = DBCrud(db=db)
+
+        db_crud.sync_climate_warehouse(
+            climate_units=[self._make_climate_unit(0), self._make_climate_unit(1)]
+        )
+        activity = TestIngestActivityWindow()._make_activity()
+        db_crud.batch_insert_ignore_activity(
+            [
+                schemas.Activity(
+                    **activity.dict()
+                    | {"coin_id": f"0x{index:064x}", "asset_id": f"0x{index:064x}"}
+                )
+                for index in range(3)
+            ]
+        )
+
+        (rows, total) = self._select_activities_joined_with_mirror(
+            db_crud, filters=[db_crud.climate_warehouse_search_filter("unit_1")]
+        )
+
+        assert total == 1
+        (activity, unit, org, project) = rows[0]
+        assert activity.asset_id == unit.asset_id == f"0x{1:064x}"
+        assert org.data == {"orgUid": "ORG_UID"}
+        assert project.data["warehouseProjectId"] == "PROJECT_ID"
+
+    @pytest.mark.parametrize(
+        "search, expected",
+        [
+            ("Côte", ["UNIT_1"]),
+            ("CÔTE D'IVOIRE", ["UNIT_1"]),
+            ("retired", ["UNIT_0"]),
+            ("unitStatus", []),
+            ("%", []),
+        ],
+    )
+    def test_search_unit_values_then_success(self, search, expected):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+        db = sessionmaker(bind=Engine)()
+        db_crud = DBCrud(db=db)
+
+        climate_units = [self._make_climate_unit(0), self._make_climate_unit(1)]
+        climate_units[0]["unitStatus"] = "Retired"
+        climate_units[1]["unitStatus"] = "Held"
+        climate_units[1]["countryJurisdictionOfOwner"] = "Côte d'Ivoire"
+        db_crud.sync_climate_warehouse(climate_units=climate_units)
+
+        activity = TestIngestActivityWindow()._make_activity()
+        db_crud.batch_insert_ignore_activity(
+            [
+                schemas.Activity(
+                    **activity.dict()
+                    | {"coin_id": f"0x{index:064x}", "asset_id": f"0x{index:064x}"}
+                )
+                for index in range(2)
+            ]
+        )
+
+        (rows, _) = self._select_activities_joined_with_mirror(
+            db_crud, filters=[db_crud.climate_warehouse_search_filter(search)]
+        )
+
+        assert [unit.warehouse_unit_id for (_, unit, _, _) in rows] == expected
+
+    def test_split_units_share_asset_id_then_joined_once(self):
+        Engine = create_engine("sqlite://")
+        Base.metadata.create_all(Engine)
+        db = sessionmaker(bind=Engine)()
+        db_crud = DBCrud(db=db)
+
+        split_unit = self._make_climate_unit(1)
+        split_unit["warehouseUnitId"] = "UNIT_1_SPLIT"
+        db_crud.sync_climate_warehouse(
+            climate_units=[self._make_climate_unit(1), split_unit]
+        )
+        activity = TestIngestActivityWindow()._make_activity()
+        db_crud.batch_insert_ignore_activity(
+            [schemas.Activity(**activity.dict() | {"asset_id": f"0x{1:064x}"})]
+        )
+
+        (rows, total) = self._select_activities_joined_with_mirror(db_crud, filters=[])
+
+        assert total == 1
+        assert [unit.warehouse_unit_id for (_, unit, _, _) in rows] == ["UNIT_1"]
@@ -0,0 +1,61 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.db.migrations import MIGRATIONS, run_migrations
+
+
+def create_legacy_database():
+    Engine = create_engine("sqlite://")
+    with Engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE activity ("
+                "id INTEGER PRIMARY KEY, org_uid VARCHAR, warehouse_project_id VARCHAR, "
+                "vintage_year INTEGER, sequence_num INTEGER, asset_id VARCHAR, "
+                "beneficiary_name VARCHAR, beneficiary_address VARCHAR, "
+                "beneficiary_puzzle_hash VARCHAR, coin_id VARCHAR, height BIGINT, "
+                "amount BIGINT, mode VARCHAR, metadata JSON, timestamp BIGINT, "
+                "created_at DATETIME, updated_at DATETIME)"
+            )
+        )
+        connection.execute(
+            text(
+                "INSERT INTO activity (id, beneficiary_name, height) "
+                "VALUES (1, 'Green Energy', 1720476)"
+            )
+        )
+
+    return Engine
+
+
+class TestRunMigrations:
+    def test_upgrade_existing_database_then_success(self):
+        Engine = create_legacy_database()
+
+        version = run_migrations(Engine)
+
+        assert version == MIGRATIONS[-1].version
+        index_names = {
+            index["name"] for index in inspect(Engine).get_indexes("activity")
+        }
+        assert {
+            "idx_activity_height_id",
+            "idx_activity_asset_id_height_id",
+            "idx_activity_mode_height_id",
+        } <= index_names
+
+        with Engine.connect() as connection:
+            rowids = (
+                connection.execute(
+                    text(
+                        "SELECT rowid FROM activity_fts WHERE activity_fts MATCH 'green'"
+                    )
+                )
+                .scalars()
+                .all()
+            )
+        assert rowids == [1]
+
+    def test_rerun_is_noop_then_success(self):
+        Engine = create_legacy_database()
+
+        assert run_migrations(Engine) == run_migrations(Engine)
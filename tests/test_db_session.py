@@ -0,0 +1,36 @@
+import pytest
+
+from app.db import session
+
+
+class TestSessionLocal:
+    @pytest.mark.asyncio
+    async def test_engine_and_session_local_are_reused_then_success(self, monkeypatch):
+        async def mock_get_challenge() -> str:
+            return "testnet"
+
+        monkeypatch.setattr(session, "get_challenge", mock_get_challenge)
+        monkeypatch.setattr(session, "_engine_by_challenge", {})
+        monkeypatch.setattr(session, "_session_local_by_challenge", {})
+
+        engine_1 = await session.get_engine_cls()
+        engine_2 = await session.get_engine_cls()
+        assert engine_1 is engine_2
+
+        session_local_1 = await session.get_session_local_cls()
+        session_local_2 = await session.get_session_local_cls()
+        assert session_local_1 is session_local_2
+        assert session_local_1.kw["bind"] is engine_1
+
+    def test_engine_uses_wal_journal_then_success(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(
+            session,
+            "get_db_url",
+            lambda challenge: f"sqlite:///{tmp_path / (challenge + '.sqlite')}",
+        )
+
+        Engine = session.create_engine_for_challenge("testnet")
+        with Engine.connect() as connection:
+            journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+
+        assert journal_mode == "wal"
@@ -0,0 +1,56 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from app.db import writer
+
+
+@pytest.fixture(scope="function")
+def mock_db(monkeypatch):
+    mock_db = mock.MagicMock()
+
+    async def mock_get_db_session():
+        yield mock_db
+
+    monkeypatch.setattr(writer.deps, "get_db_session", mock_get_db_session)
+    return mock_db
+
+
+def record(db_crud, value, commit):
+    assert commit is False
+    return value
+
+
+def fail(db_crud, commit):
+    raise ValueError("failure")
+
+
+class TestDBWriter:
+    @pytest.mark.asyncio
+    async def test_concurrent_jobs_are_committed_together_then_success(self, mock_db):
+        db_writer = writer.DBWriter()
+
+        results = await asyncio.gather(
+            *[db_writer.submit(record, value) for value in range(3)]
+        )
+        await db_writer.close()
+
+        assert results == [0, 1, 2]
+        assert mock_db.commit.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failing_job_is_isolated_then_success(self, mock_db):
+        db_writer = writer.DBWriter()
+
+        results = await asyncio.gather(
+            db_writer.submit(record, 0),
+            db_writer.submit(fail),
+            db_writer.submit(record, 2),
+            return_exceptions=True,
+        )
+        await db_writer.close()
+
+        assert results[0] == 0
+        assert isinstance(results[1], ValueError)
+        assert results[2] == 2
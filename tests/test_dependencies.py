@@ -0,0 +1,106 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from aiohttp import web
+
+from app.api import dependencies as deps
+
+
+class TestRpcClientManager:
+    @pytest.mark.asyncio
+    async def test_client_is_reused_then_success(self, monkeypatch):
+        mock_create = mock.AsyncMock(return_value=mock.MagicMock())
+        monkeypatch.setattr(deps.FullNodeRpcClient, "create", mock_create)
+
+        manager = deps.RpcClientManager(
+            node_type=deps.NodeType.FULL_NODE,
+            self_hostname="localhost",
+            rpc_port=8555,
+        )
+        monkeypatch.setattr(manager, "_net_config", {})
+
+        client_1 = await manager.get_client()
+        client_2 = await manager.get_client()
+
+        assert client_1 is client_2
+        assert mock_create.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_health_check_then_reconnect(self, monkeypatch):
+        mock_client = mock.MagicMock()
+        mock_client.fetch = mock.AsyncMock(side_effect=ConnectionError())
+        mock_client.await_closed = mock.AsyncMock()
+        mock_create = mock.AsyncMock(side_effect=[mock_client, mock.MagicMock()])
+        monkeypatch.setattr(deps.FullNodeRpcClient, "create", mock_create)
+
+        manager = deps.RpcClientManager(
+            node_type=deps.NodeType.FULL_NODE,
+            self_hostname="localhost",
+            rpc_port=8555,
+        )
+        monkeypatch.setattr(manager, "_net_config", {})
+
+        client_1 = await manager.get_client()
+        assert await manager.check_health() is False
+        mock_client.close.assert_called_once()
+
+        client_2 = await manager.get_client()
+        assert client_1 is not client_2
+        assert mock_create.await_count == 2
+
+
+class TestPeakWatcher:
+    @pytest.mark.asyncio
+    async def test_new_peaks_from_daemon_then_success(self):
+        registrations = []
+
+        async def daemon_handler(request):
+            websocket = web.WebSocketResponse()
+            await websocket.prepare(request)
+
+            registrations.append(await websocket.receive_json())
+            for (command, height) in [
+                ("get_blockchain_state", 100),
+                ("get_connections", 101),
+                ("get_blockchain_state", 102),
+            ]:
+                await websocket.send_json(
+                    {
+                        "command": command,
+                        "data": {"blockchain_state": {"peak": {"height": height}}},
+                    }
+                )
+            await websocket.send_json(
+                {"command": "get_blockchain_state", "data": {"blockchain_state": {}}}
+            )
+            await websocket.close()
+            return websocket
+
+        app = web.Application()
+        app.router.add_get("/", daemon_handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        heights = []
+        peak = asyncio.Event()
+
+        async def on_peak(height):
+            heights.append(height)
+            if len(heights) == 2:
+                peak.set()
+
+        watcher = deps.PeakWatcher(uri=f"ws://127.0.0.1:{port}", on_peak=on_peak)
+        try:
+            watcher.start()
+            await asyncio.wait_for(peak.wait(), timeout=5)
+        finally:
+            await watcher.close()
+            await runner.cleanup()
+
+        assert heights == [100, 102]
+        assert registrations[0]["command"] == "register_service"
+        assert registrations[0]["data"] == {"service": "wallet_ui"}
@@ -0,0 +1,182 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from blspy import G1Element
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.sized_bytes import bytes32
+from chia.types.coin_record import CoinRecord
+from chia.util.ints import uint32, uint64
+
+from app import crud
+from app.core.climate_wallet.wallet import ClimateObserverWallet
+from app.core.types import ClimateTokenIndex
+
+
+def make_coin_record(puzzle_hash: bytes32, amount: int) -> CoinRecord:
+    return CoinRecord(
+        coin=Coin(bytes32(b"\x00" * 32), puzzle_hash, uint64(amount)),
+        confirmed_block_index=uint32(1),
+        spent_block_index=uint32(2),
+        coinbase=False,
+        timestamp=uint64(0),
+    )
+
+
+class TestClimateObserverWallet:
+    @pytest.mark.asyncio
+    async def test_get_coin_records_by_wallets_then_success(self):
+        mock_full_node_client = mock.MagicMock()
+        wallets = [
+            ClimateObserverWallet(
+                token_index=ClimateTokenIndex(
+                    org_uid="ORG_UID",
+                    warehouse_project_id="WAREHOUSE_PROJECT_ID",
+                    vintage_year=2050,
+                    sequence_num=sequence_num,
+                ),
+                root_public_key=G1Element.generator(),
+                full_node_client=mock_full_node_client,
+            )
+            for sequence_num in range(3)
+        ]
+        puzzle_hashes = [wallet.gateway_cat_puzzle_hash for wallet in wallets]
+
+        mock_full_node_client.get_coin_records_by_puzzle_hashes = mock.AsyncMock(
+            return_value=[
+                make_coin_record(puzzle_hashes[2], 1),
+                make_coin_record(puzzle_hashes[0], 2),
+                make_coin_record(puzzle_hashes[2], 3),
+            ]
+        )
+
+        coin_records_by_wallet = (
+            await ClimateObserverWallet.get_coin_records_by_wallets(
+                full_node_client=mock_full_node_client,
+                wallets=wallets,
+                start_height=0,
+                end_height=10,
+            )
+        )
+
+        assert mock_full_node_client.get_coin_records_by_puzzle_hashes.await_count == 1
+        assert [
+            [coin_record.coin.amount for coin_record in coin_records]
+            for coin_records in coin_records_by_wallet
+        ] == [[2], [], [1, 3]]
+
+    @pytest.mark.asyncio
+    async def test_get_activities_from_coin_records_pipelined_then_success(
+        self, monkeypatch
+    ):
+        in_flight = 0
+        max_in_flight = 0
+
+        async def mock_get_puzzle_and_solution(coin_id, height):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            # later coins arrive first
+            await asyncio.sleep(0.001 * (10 - coin_amounts[coin_id]))
+            in_flight -= 1
+            return coin_id
+
+        def mock_parse_activity(self, coin_record, coin_spend, modes):
+            if coin_record.coin.amount % 2:
+                return None
+
+            return {"coin_record": coin_record, "coin_spend": coin_spend}
+
+        coin_records = [
+            make_coin_record(bytes32(b"\x01" * 32), amount) for amount in range(10)
+        ]
+        coin_amounts = {
+            coin_record.coin.name(): coin_record.coin.amount
+            for coin_record in coin_records
+        }
+
+        mock_full_node_client = mock.MagicMock()
+        mock_full_node_client.get_puzzle_and_solution = mock_get_puzzle_and_solution
+        monkeypatch.setattr(
+            ClimateObserverWallet, "_parse_activity", mock_parse_activity
+        )
+
+        wallet = ClimateObserverWallet(
+            token_index=ClimateTokenIndex(
+                org_uid="ORG_UID",
+                warehouse_project_id="WAREHOUSE_PROJECT_ID",
+                vintage_year=2050,
+            ),
+            root_public_key=G1Element.generator(),
+            full_node_client=mock_full_node_client,
+        )
+        activities = await wallet.get_activities_from_coin_records(
+            coin_records=coin_records,
+            max_in_flight=3,
+        )
+
+        assert max_in_flight == 3
+        assert [activity["coin_record"].coin.amount for activity in activities] == [
+            0,
+            2,
+            4,
+            6,
+            8,
+        ]
+
+
+class TestGetActivitiesByTokens:
+    @pytest.mark.asyncio
+    async def test_spends_of_tokens_fetched_concurrently_then_success(
+        self, monkeypatch
+    ):
+        wallets = [
+            ClimateObserverWallet(
+                token_index=ClimateTokenIndex(
+                    org_uid="ORG_UID",
+                    warehouse_project_id="WAREHOUSE_PROJECT_ID",
+                    vintage_year=2050,
+                    sequence_num=sequence_num,
+                ),
+                root_public_key=G1Element.generator(),
+                full_node_client=None,
+            )
+            for sequence_num in range(4)
+        ]
+
+        in_flight = 0
+        max_in_flight = 0
+
+        async def get_puzzle_and_solution(**kwargs):
+            nonlocal in_flight, max_in_flight
+
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        mock_full_node_client = mock.MagicMock()
+        mock_full_node_client.get_coin_records_by_puzzle_hashes = mock.AsyncMock(
+            return_value=[
+                make_coin_record(wallet.gateway_cat_puzzle_hash, 1)
+                for wallet in wallets
+            ]
+        )
+        mock_full_node_client.get_puzzle_and_solution = get_puzzle_and_solution
+
+        monkeypatch.setattr(crud.chia.settings, "SCAN_SPEND_CONCURRENCY", 3)
+        monkeypatch.setattr(
+            ClimateObserverWallet, "_parse_activity", lambda self, **kwargs: None
+        )
+
+        blockchain = crud.BlockChainCrud(full_node_client=mock_full_node_client)
+        activities_by_token = await blockchain.get_activities_by_tokens(
+            tokens=[wallet.token for wallet in wallets],
+            start_height=0,
+            end_height=10,
+        )
+
+        assert activities_by_token == [[], [], [], []]
+        assert max_in_flight == 3
+        # coin records count towards the scanned load even without activities
+        assert blockchain.num_coin_records == 4